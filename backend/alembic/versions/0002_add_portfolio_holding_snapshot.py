@@ -0,0 +1,34 @@
+"""add portfolio holding snapshot
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:05:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "portfolio_holding_snapshot",
+        sa.Column("portfolio_id", sa.Integer(), nullable=False),
+        sa.Column("ticker", sa.String(), nullable=False),
+        sa.Column("as_of", sa.Date(), nullable=False),
+        sa.Column("quantity", sa.Float(), nullable=False),
+        sa.Column("cost_basis_cents", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["portfolio_id"], ["portfolio.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("portfolio_id", "ticker", "as_of"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("portfolio_holding_snapshot")
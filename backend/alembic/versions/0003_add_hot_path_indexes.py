@@ -0,0 +1,88 @@
+"""add indexes for hot query paths
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, included columns, extra create_index kwargs)
+INDEXES = [
+    # get_all_portfolio_transactions: filter by portfolio, order by purchase time.
+    (
+        "ix_transaction_portfolio_id_purchased_at_created_at",
+        "transaction",
+        ["portfolio_id", "purchased_at", "created_at"],
+        [],
+        {},
+    ),
+    # Data export streams a user's transactions in id order.
+    ("ix_transaction_user_id_id", "transaction", ["user_id", "id"], [], {}),
+    # get_all_transactions joins portfolios by owner.
+    ("ix_portfolio_user_id", "portfolio", ["user_id"], ["id"], {}),
+    # SPY lookups and the backfill upsert (ON CONFLICT (ticker, date)).
+    (
+        "uq_index_price_history_ticker_date",
+        "index_price_history",
+        ["ticker", "date"],
+        ["open_price_cents"],
+        {"unique": True},
+    ),
+    # forgot-password deletes a user's previous requests.
+    (
+        "ix_reset_password_request_user_id",
+        "reset_password_request",
+        ["user_id"],
+        [],
+        {},
+    ),
+    # /user/list prefix filters.
+    (
+        "ix_user_username_pattern",
+        "user",
+        ["username"],
+        [],
+        {"postgresql_ops": {"username": "text_pattern_ops"}},
+    ),
+    (
+        "ix_user_email_pattern",
+        "user",
+        ["email"],
+        [],
+        {"postgresql_ops": {"email": "text_pattern_ops"}},
+    ),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY avoids locking these tables against writes while building,
+    # but cannot run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        for name, table, columns, include, kwargs in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_include=include,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, *_ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table, postgresql_concurrently=True, if_exists=True
+            )
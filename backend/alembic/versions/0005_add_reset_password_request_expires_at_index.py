@@ -0,0 +1,38 @@
+"""add reset password request expires_at index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 16:40:00.000000
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The purge job reads expired requests oldest first, in batches.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_reset_password_request_expires_at",
+            "reset_password_request",
+            ["expires_at"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_reset_password_request_expires_at",
+            table_name="reset_password_request",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
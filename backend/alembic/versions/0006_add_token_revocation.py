@@ -0,0 +1,50 @@
+"""add token revocation
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 18:05:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "token_revocation_watermark",
+        sa.Column("user_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("not_before", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_index(
+        "ix_token_revocation_watermark_updated_at",
+        "token_revocation_watermark",
+        ["updated_at"],
+    )
+    op.create_table(
+        "revoked_token",
+        sa.Column("jti", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.Float(), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("jti"),
+    )
+    op.create_index("ix_revoked_token_revoked_at", "revoked_token", ["revoked_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_revoked_token_revoked_at", table_name="revoked_token")
+    op.drop_table("revoked_token")
+    op.drop_index(
+        "ix_token_revocation_watermark_updated_at",
+        table_name="token_revocation_watermark",
+    )
+    op.drop_table("token_revocation_watermark")
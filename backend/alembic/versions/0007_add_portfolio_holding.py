@@ -0,0 +1,48 @@
+"""add portfolio holding
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 20:10:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "portfolio_holding",
+        sa.Column("portfolio_id", sa.Integer(), nullable=False),
+        sa.Column("ticker", sa.String(), nullable=False),
+        sa.Column("as_of", sa.Date(), nullable=False),
+        sa.Column("quantity", sa.Float(), nullable=False),
+        sa.Column("cost_basis_cents", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["portfolio_id"], ["portfolio.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("portfolio_id", "ticker"),
+    )
+    # Seed it with the latest snapshot of each open position.
+    op.execute(
+        """
+        INSERT INTO portfolio_holding
+            (portfolio_id, ticker, as_of, quantity, cost_basis_cents)
+        SELECT portfolio_id, ticker, as_of, quantity, cost_basis_cents
+        FROM (
+            SELECT DISTINCT ON (portfolio_id, ticker) *
+            FROM portfolio_holding_snapshot
+            ORDER BY portfolio_id, ticker, as_of DESC
+        ) AS latest
+        WHERE abs(quantity) > 1e-9
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("portfolio_holding")
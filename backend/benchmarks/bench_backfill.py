@@ -0,0 +1,60 @@
+"""
+Times the COPY + upsert path of the index price backfill on a generated CSV
+(a decade of weekday prices for several tickers). The load runs inside a
+transaction that is rolled back, so the database is left unchanged.
+
+Run from backend/: python -m benchmarks.bench_backfill --years 10 --tickers 5
+"""
+
+import argparse
+import csv
+import tempfile
+import time
+from datetime import date
+from datetime import timedelta
+
+from project_name.db.engine import get_sqlalchemy_engine
+from project_name.jobs.backfill_index_prices import load_prices
+from project_name.jobs.backfill_index_prices import read_price_csv
+
+
+def _write_csv(csv_file, years: int, tickers: int) -> int:
+    writer = csv.writer(csv_file)
+    writer.writerow(("ticker", "date", "open_price_cents"))
+    start = date.today() - timedelta(days=365 * years)
+    rows = 0
+    for ticker_index in range(tickers):
+        for offset in range(365 * years):
+            day = start + timedelta(days=offset)
+            if day.weekday() < 5:
+                writer.writerow(
+                    (f"BENCH{ticker_index}", day.isoformat(), 10_000 + offset)
+                )
+                rows += 1
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--tickers", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w+", suffix=".csv", newline="") as csv_file:
+        rows = _write_csv(csv_file, args.years, args.tickers)
+        csv_file.seek(0)
+
+        with get_sqlalchemy_engine().connect() as connection:
+            transaction = connection.begin()
+            try:
+                started = time.perf_counter()
+                loaded = load_prices(connection, read_price_csv(csv_file))
+                elapsed = time.perf_counter() - started
+            finally:
+                transaction.rollback()
+
+    print(f"loaded {loaded}/{rows} rows in {elapsed * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
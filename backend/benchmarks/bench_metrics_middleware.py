@@ -0,0 +1,100 @@
+"""
+Measures the per-request overhead of MetricsMiddleware by calling a trivial
+ASGI app directly (no sockets or HTTP parsing), with and without the
+middleware, and the per-query overhead of the cursor execute hooks against an
+in-memory SQLite database. Exits non-zero if the middleware is over budget.
+
+The fastest of several rounds is reported, since slower ones only measure noise
+from the machine.
+
+Run from backend/: python -m benchmarks.bench_metrics_middleware --budget-us 6
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy import text
+
+from project_name.utils.metrics import _request_db_stats
+from project_name.utils.metrics import MetricsMiddleware
+from project_name.utils.metrics import RequestDbStats
+
+
+class _Route:
+    path = "/user/{username}"
+
+
+async def _app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+async def _time_requests(app, iterations: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/user/benchmark"}
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), _receive, _send)
+    return (time.perf_counter() - started) / iterations
+
+
+def _time_queries(iterations: int, in_request: bool) -> float:
+    engine = create_engine("sqlite://")
+    token = _request_db_stats.set(RequestDbStats() if in_request else None)
+    try:
+        with engine.connect() as connection:
+            started = time.perf_counter()
+            for _ in range(iterations):
+                connection.execute(text("SELECT 1"))
+            return (time.perf_counter() - started) / iterations
+    finally:
+        _request_db_stats.reset(token)
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--budget-us", type=float, default=6)
+    args = parser.parse_args()
+
+    middleware = MetricsMiddleware(_app)
+    # Warm up label caches and the event loop.
+    await _time_requests(middleware, 1_000)
+
+    bare = instrumented = float("inf")
+    for _ in range(args.rounds):
+        bare = min(bare, await _time_requests(_app, args.iterations))
+        instrumented = min(
+            instrumented, await _time_requests(middleware, args.iterations)
+        )
+    overhead = (instrumented - bare) * 1e6
+    print(f"bare app:          {bare * 1e6:8.2f} us/request")
+    print(f"with middleware:   {instrumented * 1e6:8.2f} us/request")
+    print(f"overhead:          {overhead:8.2f} us/request (budget {args.budget_us} us)")
+
+    outside = _time_queries(args.iterations // 10, in_request=False)
+    inside = _time_queries(args.iterations // 10, in_request=True)
+    print(f"query (no request): {outside * 1e6:7.2f} us/query")
+    print(f"query (in request): {inside * 1e6:7.2f} us/query")
+    print(f"hook overhead:      {(inside - outside) * 1e6:7.2f} us/query")
+
+    if overhead > args.budget_us:
+        print(f"FAIL: over budget by {overhead - args.budget_us:.2f} us")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
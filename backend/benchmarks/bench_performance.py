@@ -0,0 +1,94 @@
+"""
+Times compute_performance on synthetic portfolios of 1k, 100k and 1M
+transactions, against a plain Python loop computing the same running totals.
+
+Run from backend/: python -m benchmarks.bench_performance
+"""
+
+import argparse
+import time
+from datetime import date
+from datetime import timedelta
+
+import numpy as np
+
+from project_name.modules.index_prices import IndexPriceSeries
+from project_name.modules.performance import compute_performance
+from project_name.modules.performance import TransactionColumns
+
+START_DATE = date(2000, 1, 3)
+TICKERS = [f"T{i:03d}" for i in range(500)]
+
+
+def _spy_series(days: int) -> IndexPriceSeries:
+    series = IndexPriceSeries("SPY")
+    series.extend(
+        (START_DATE + timedelta(days=day), 10_000 + day)
+        for day in range(days)
+        if (START_DATE + timedelta(days=day)).weekday() < 5
+    )
+    return series
+
+
+def _columns(size: int, portfolios: int, rng: np.random.Generator):
+    portfolio_ids = np.sort(rng.integers(0, portfolios, size))
+    offsets = rng.integers(0, 365 * 20, size)
+    # Within a portfolio, transactions are ordered by purchase date.
+    order = np.lexsort((offsets, portfolio_ids))
+    return TransactionColumns.from_rows(
+        portfolio_ids=portfolio_ids[order].tolist(),
+        tickers=[TICKERS[i] for i in rng.integers(0, len(TICKERS), size)],
+        quantities=rng.integers(1, 100, size).tolist(),
+        price_cents=rng.integers(100, 100_000, size).tolist(),
+        is_sell=(rng.random(size) < 0.3).tolist(),
+        purchased_at=[START_DATE + timedelta(days=int(d)) for d in offsets[order]],
+    )
+
+
+def _python_loop(columns: TransactionColumns, spy: IndexPriceSeries) -> None:
+    net_invested, spy_shares, positions = {}, {}, {}
+    for i in range(len(columns)):
+        portfolio_id = int(columns.portfolio_ids[i])
+        cash_flow = float(columns.quantity[i]) * int(columns.price_cents[i])
+        net_invested[portfolio_id] = net_invested.get(portfolio_id, 0) + cash_flow
+        spy_price = spy.price_on_or_before(
+            date.fromordinal(int(columns.purchased_at[i]))
+        )
+        if spy_price:
+            spy_shares[portfolio_id] = (
+                spy_shares.get(portfolio_id, 0) + cash_flow / spy_price
+            )
+        key = (portfolio_id, int(columns.ticker_codes[i]))
+        positions[key] = positions.get(key, 0) + float(columns.quantity[i])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--portfolios", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    spy = _spy_series(365 * 21)
+
+    for size in args.sizes:
+        columns = _columns(size, args.portfolios, rng)
+
+        started = time.perf_counter()
+        compute_performance(columns, spy)
+        vectorized = time.perf_counter() - started
+
+        started = time.perf_counter()
+        _python_loop(columns, spy)
+        looped = time.perf_counter() - started
+
+        print(
+            f"{size:>9} transactions: vectorized {vectorized * 1e3:9.2f} ms, "
+            f"python loop {looped * 1e3:9.2f} ms ({looped / vectorized:6.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compares serializing a page of users the previous way (a DisplayUser built
+field by field with a stringified created_at, then jsonable_encoder and
+json.dumps, as FastAPI does for returned models) with the DisplayUserList
+TypeAdapter dumping the rows in pydantic-core. Rows come from an in-memory
+SQLite copy of the user table, selected as /user/list does.
+
+Run from backend/: python -m benchmarks.bench_serialization --users 10000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from datetime import timedelta
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import create_engine
+from sqlalchemy import insert
+from sqlalchemy import select
+
+from project_name.db.models import User
+from project_name.modules.auth.models import DisplayUserList
+
+
+class _PreviousDisplayUser(BaseModel):
+    username: str
+    email: str
+    created_at: str
+    is_admin: bool
+
+
+def _previous_path(rows) -> bytes:
+    users = [
+        _PreviousDisplayUser(
+            username=row.username,
+            email=row.email,
+            created_at=str(row.created_at),
+            is_admin=row.is_admin,
+        )
+        for row in rows
+    ]
+    return json.dumps(jsonable_encoder(users)).encode("utf-8")
+
+
+def _adapter_path(rows) -> bytes:
+    return DisplayUserList.dump_json(
+        [
+            {
+                "username": username,
+                "email": email,
+                "created_at": created_at,
+                "is_admin": is_admin,
+            }
+            for _, username, email, created_at, is_admin in rows
+        ]
+    )
+
+
+def _time(fn, rows, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(rows)
+    return (time.perf_counter() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User),
+            [
+                {
+                    "username": f"user_{i}",
+                    "email": f"user_{i}@example.com",
+                    "hashed_password": "x",
+                    "is_admin": i % 10 == 0,
+                    "created_at": datetime(2024, 1, 1) + timedelta(seconds=i),
+                }
+                for i in range(args.users)
+            ],
+        )
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(User.id, User.username, User.email, User.created_at, User.is_admin)
+        ).all()
+
+    assert len(json.loads(_previous_path(rows))) == len(json.loads(_adapter_path(rows)))
+
+    previous = _time(_previous_path, rows, args.repeat)
+    adapter = _time(_adapter_path, rows, args.repeat)
+    print(f"previous path:  {previous * 1e3:8.2f} ms per {args.users} users")
+    print(f"TypeAdapter:    {adapter * 1e3:8.2f} ms per {args.users} users")
+    print(f"speedup:        {previous / adapter:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
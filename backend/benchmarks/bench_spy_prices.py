@@ -0,0 +1,70 @@
+"""
+Compares the previous `IN (...)` query path of get_spy_prices_for_dates with
+the cached, array-backed lookup. Needs a database with SPY price history.
+
+Run from backend/: python -m benchmarks.bench_spy_prices --dates 10000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from project_name.db.engine import get_async_session_factory
+from project_name.db.models import IndexPriceHistory
+from project_name.modules.common import get_spy_prices_for_dates
+from project_name.modules.common import SPY_TICKER
+from project_name.modules.index_prices import index_price_cache
+
+
+async def _query_path(db_session, dates):
+    spy_prices = await db_session.scalars(
+        select(IndexPriceHistory)
+        .where(IndexPriceHistory.ticker == SPY_TICKER)
+        .where(IndexPriceHistory.date.in_(dates))
+    )
+    return {price.date.date(): price.open_price_cents for price in spy_prices}
+
+
+async def _time(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - started) / repeat
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dates", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    async with get_async_session_factory()() as db_session:
+        started = time.perf_counter()
+        series = await index_price_cache.get_series(db_session, SPY_TICKER)
+        load_seconds = time.perf_counter() - started
+        if not len(series):
+            raise SystemExit("No SPY price history found; run the backfill first.")
+
+        last_date = series.last_date
+        dates = [
+            last_date - timedelta(days=random.randrange(365 * 20))
+            for _ in range(args.dates)
+        ]
+
+        query = await _time(lambda: _query_path(db_session, dates), args.repeat)
+        cached = await _time(
+            lambda: get_spy_prices_for_dates(dates, db_session), args.repeat
+        )
+
+    print(f"cache load ({len(series)} rows): {load_seconds * 1e3:8.2f} ms (once)")
+    print(f"IN (...) query, {args.dates} dates: {query * 1e3:8.2f} ms/call")
+    print(f"cached lookup,  {args.dates} dates: {cached * 1e3:8.2f} ms/call")
+    print(f"speedup:                       {query / cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""
+Measures the cold-start import time of the app and exits non-zero if it is over
+budget, or if importing it pulls in a module that should only be loaded on
+first use (database drivers, password hashing, JWT, SMTP, HTTP clients).
+
+Each run is a fresh interpreter under `python -X importtime`; the fastest run
+is reported, since slower ones only measure noise from the machine.
+
+Run from backend/: python -m benchmarks.check_import_time --budget-ms 900
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# configs.py loads .env from the working directory.
+PROJECT_DIR = BACKEND_DIR / "project_name"
+
+# Loaded lazily by the code that needs them; importing the app must not.
+DEFERRED_MODULES = (
+    "asyncpg",
+    "psycopg2",
+    "passlib",
+    "jose",
+    "smtplib",
+    "requests",
+    "uvicorn",
+)
+
+CHECK_DEFERRED = """
+import sys
+import {module}
+print(",".join(m for m in {deferred!r} if m in sys.modules))
+"""
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=str(BACKEND_DIR))
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=PROJECT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Total import time of `module` and the cumulative time of each top-level
+    package it imported, both in milliseconds.
+    """
+
+    stderr = _run(["-X", "importtime", "-c", f"import {module}"]).stderr
+    total = 0.0
+    packages: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        cumulative_ms = int(cumulative) / 1000
+        if name.strip() == module:
+            total = cumulative_ms
+        elif name.startswith("   ") and not name.startswith("    "):
+            # Direct imports of the measured module.
+            packages[name.strip()] = cumulative_ms
+    return total, packages
+
+
+def find_deferred_imports(module: str) -> List[str]:
+    script = CHECK_DEFERRED.format(module=module, deferred=DEFERRED_MODULES)
+    loaded = _run(["-c", script]).stdout.strip()
+    return loaded.split(",") if loaded else []
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="project_name.main")
+    parser.add_argument("--budget-ms", type=float, default=900)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    total, packages = min(
+        (measure_import(args.module) for _ in range(args.runs)),
+        key=lambda run: run[0],
+    )
+    print(f"import {args.module}: {total:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for name, cumulative_ms in sorted(packages.items(), key=lambda item: -item[1])[
+        : args.top
+    ]:
+        print(f"  {cumulative_ms:8.1f} ms  {name}")
+
+    failed = False
+    if total > args.budget_ms:
+        print(f"FAIL: over budget by {total - args.budget_ms:.0f} ms")
+        failed = True
+    for module in ("project_name.db.models", args.module):
+        loaded = find_deferred_imports(module)
+        if loaded:
+            print(f"FAIL: importing {module} loads {', '.join(loaded)}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
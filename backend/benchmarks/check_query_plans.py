@@ -0,0 +1,167 @@
+"""
+Seeds a throwaway dataset inside a transaction, runs EXPLAIN on the hot query
+paths and exits non-zero if any of them falls back to a sequential scan on the
+tables it should reach through an index. Everything is rolled back afterwards.
+
+Run from backend/ against a migrated database:
+    python -m benchmarks.check_query_plans
+"""
+
+import sys
+from datetime import date
+from datetime import timedelta
+
+from sqlalchemy import delete
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from project_name.db.engine import get_sqlalchemy_engine
+from project_name.db.models import IndexPriceHistory
+from project_name.db.models import Portfolio
+from project_name.db.models import PortfolioHolding
+from project_name.db.models import ResetPasswordRequest
+from project_name.db.models import Transaction
+from project_name.db.models import User
+
+SEED_SQL = """
+INSERT INTO "user" (username, email, hashed_password, is_admin, created_at)
+SELECT 'plan_user_' || i, 'plan_user_' || i || '@example.com', 'x', false, now()
+FROM generate_series(1, :users) AS i;
+
+INSERT INTO portfolio (user_id, name, description, created_at)
+SELECT u.id, 'portfolio', '', now()
+FROM "user" u, generate_series(1, 3)
+WHERE u.username LIKE 'plan\\_user\\_%';
+
+INSERT INTO transaction (
+    user_id, portfolio_id, ticker, price_cents, quantity, transaction_type,
+    created_at, purchased_at
+)
+SELECT p.user_id, p.id, 'T' || (i % 50), 10000, 1, 'BUY', now(),
+       now() - (i || ' days')::interval
+FROM portfolio p, generate_series(1, :transactions_per_portfolio) AS i
+WHERE p.user_id IN (SELECT id FROM "user" WHERE username LIKE 'plan\\_user\\_%');
+
+INSERT INTO portfolio_holding (
+    portfolio_id, ticker, as_of, quantity, cost_basis_cents
+)
+SELECT t.portfolio_id, t.ticker, max(t.purchased_at)::date, sum(t.quantity),
+       sum(t.quantity * t.price_cents)
+FROM transaction t
+WHERE t.user_id IN (SELECT id FROM "user" WHERE username LIKE 'plan\\_user\\_%')
+GROUP BY t.portfolio_id, t.ticker;
+
+INSERT INTO index_price_history (ticker, date, open_price_cents)
+SELECT t.ticker, d, 10000
+FROM (VALUES ('SPY'), ('QQQ'), ('DIA'), ('IWM')) AS t(ticker),
+     generate_series(now() - interval '20 years', now(), interval '1 day') AS d
+ON CONFLICT DO NOTHING;
+
+INSERT INTO reset_password_request (uuid_token, user_id, expires_at)
+SELECT gen_random_uuid()::text, id, now() + interval '1 hour'
+FROM "user" WHERE username LIKE 'plan\\_user\\_%';
+
+ANALYZE "user";
+ANALYZE portfolio;
+ANALYZE transaction;
+ANALYZE portfolio_holding;
+ANALYZE index_price_history;
+ANALYZE reset_password_request;
+"""
+
+
+def _hot_queries(user_id: int, portfolio_id: int) -> dict:
+    dates = [date.today() - timedelta(days=7 * i) for i in range(200)]
+    return {
+        "transactions by portfolio": (
+            select(Transaction)
+            .where(Transaction.portfolio_id == portfolio_id)
+            .order_by(Transaction.purchased_at.asc(), Transaction.created_at.asc()),
+            {"transaction"},
+        ),
+        "transactions by user": (
+            select(Transaction)
+            .join(Portfolio)
+            .where(Portfolio.user_id == user_id)
+            .order_by(Transaction.purchased_at.asc(), Transaction.created_at.asc()),
+            {"transaction", "portfolio"},
+        ),
+        "current holdings": (
+            select(PortfolioHolding)
+            .where(PortfolioHolding.portfolio_id == portfolio_id)
+            .order_by(PortfolioHolding.ticker),
+            {"portfolio_holding"},
+        ),
+        "SPY prices for dates": (
+            select(IndexPriceHistory)
+            .where(IndexPriceHistory.ticker == "SPY")
+            .where(IndexPriceHistory.date.in_(dates)),
+            {"index_price_history"},
+        ),
+        "reset requests by user": (
+            delete(ResetPasswordRequest).where(ResetPasswordRequest.user_id == user_id),
+            {"reset_password_request"},
+        ),
+        "users by username prefix": (
+            select(User.id, User.username)
+            .where(User.username.startswith("plan_user_1", autoescape=True))
+            .order_by(User.id),
+            {"user"},
+        ),
+    }
+
+
+def _seq_scans(plan: dict) -> set[str]:
+    tables = set()
+    if plan.get("Node Type") == "Seq Scan":
+        tables.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        tables |= _seq_scans(child)
+    return tables
+
+
+def main(users: int = 2000, transactions_per_portfolio: int = 200) -> int:
+    failures = []
+    engine = get_sqlalchemy_engine()
+
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            connection.execute(
+                text(SEED_SQL),
+                {
+                    "users": users,
+                    "transactions_per_portfolio": transactions_per_portfolio,
+                },
+            )
+            user_id, portfolio_id = connection.execute(
+                select(Portfolio.user_id, Portfolio.id)
+                .join(User, User.id == Portfolio.user_id)
+                .where(User.username == "plan_user_1")
+                .limit(1)
+            ).one()
+
+            for name, (query, tables) in _hot_queries(user_id, portfolio_id).items():
+                compiled = query.compile(
+                    dialect=postgresql.dialect(),
+                    compile_kwargs={"literal_binds": True},
+                )
+                plan = connection.execute(
+                    text(f"EXPLAIN (FORMAT JSON) {compiled}")
+                ).scalar_one()[0]["Plan"]
+                scanned = _seq_scans(plan) & tables
+                status = (
+                    f"SEQ SCAN on {', '.join(sorted(scanned))}" if scanned else "ok"
+                )
+                print(f"{name:<28} {status}")
+                if scanned:
+                    failures.append(name)
+        finally:
+            transaction.rollback()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
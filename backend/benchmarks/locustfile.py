@@ -0,0 +1,58 @@
+"""
+Load scenario for the hottest API routes: login, /user/me, /user/list and
+forgot-password. Each simulated user registers its own account on start.
+
+Start Postgres and the API (leave the email worker stopped so forgot-password
+does not send real mail, and set RATE_LIMIT_ENABLED=false on the backend since
+every simulated user shares one IP), then run from backend/:
+    docker compose -f ../deploy/docker-compose.yml up -d db backend
+    locust -f benchmarks/locustfile.py --host http://localhost:8080 \\
+        --headless -u 200 -r 20 -t 2m --csv load
+    python -m benchmarks.results record --label <name> --load load_stats.csv
+"""
+
+import uuid
+
+from locust import between
+from locust import HttpUser
+from locust import task
+
+PASSWORD = "load-test-password"
+
+
+class ApiUser(HttpUser):
+    wait_time = between(0.1, 0.5)
+
+    def on_start(self):
+        self.username = f"load_{uuid.uuid4().hex[:12]}"
+        # Registration sets the access_token cookie on this client. Accounts
+        # are created as admins, so /user/list is allowed.
+        self.client.post(
+            "/auth/register",
+            json={
+                "username": self.username,
+                "email": f"{self.username}@example.com",
+                "password": PASSWORD,
+                "confirm_password": PASSWORD,
+            },
+        )
+
+    @task(2)
+    def login(self):
+        self.client.post(
+            "/auth/token", json={"username": self.username, "password": PASSWORD}
+        )
+
+    @task(10)
+    def me(self):
+        self.client.get("/user/me")
+
+    @task(3)
+    def list_users(self):
+        self.client.get("/user/list?limit=100", name="/user/list")
+
+    @task(1)
+    def forgot_password(self):
+        self.client.post(
+            "/auth/forgot-password", json={"email_or_username": self.username}
+        )
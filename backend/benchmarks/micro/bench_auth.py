@@ -0,0 +1,56 @@
+"""
+Micro-benchmarks for the CPU work done on authenticated requests.
+
+Run from backend/ (add --benchmark-json to record the run, see results.py):
+    python -m pytest benchmarks/micro --benchmark-json=micro.json
+"""
+
+from datetime import datetime
+from datetime import timedelta
+
+from jose import jwt
+
+from project_name.configs import HASH_ALGORITHM
+from project_name.configs import HASH_SECRET_KEY
+from project_name.db.models import User
+from project_name.modules.auth.models import DisplayUser
+from project_name.utils.auth import create_access_token
+from project_name.utils.auth import decode_access_token
+from project_name.utils.auth import jwt_decode_cache
+from project_name.utils.hashing import get_password_hash
+from project_name.utils.hashing import verify_password
+
+PASSWORD = "benchmark-password"
+HASHED_PASSWORD = get_password_hash(PASSWORD)
+TOKEN = create_access_token({"sub": "benchmark"}, timedelta(minutes=30))
+
+
+def bench_verify_password(benchmark):
+    assert benchmark(verify_password, PASSWORD, HASHED_PASSWORD)
+
+
+def bench_create_access_token(benchmark):
+    benchmark(create_access_token, {"sub": "benchmark"}, timedelta(minutes=30))
+
+
+def bench_jwt_decode(benchmark):
+    claims = benchmark(jwt.decode, TOKEN, HASH_SECRET_KEY, algorithms=[HASH_ALGORITHM])
+    assert claims["sub"] == "benchmark"
+
+
+def bench_decode_access_token_cached(benchmark):
+    jwt_decode_cache.clear()
+    decode_access_token(TOKEN)
+    assert benchmark(decode_access_token, TOKEN)["sub"] == "benchmark"
+
+
+def bench_display_user_from_db(benchmark):
+    user = User(
+        id=1,
+        username="benchmark",
+        email="benchmark@example.com",
+        hashed_password=HASHED_PASSWORD,
+        is_admin=False,
+        created_at=datetime(2024, 1, 1),
+    )
+    benchmark(lambda: DisplayUser.from_db(user).model_dump_json())
@@ -0,0 +1,43 @@
+"""
+Micro-benchmark for SPY price lookups served from the in-process cache. The
+cache is seeded directly, so no database is needed.
+"""
+
+import asyncio
+import random
+from datetime import date
+from datetime import timedelta
+
+import pytest
+
+from project_name.modules.common import get_spy_prices_for_dates
+from project_name.modules.common import SPY_TICKER
+from project_name.modules.index_prices import index_price_cache
+from project_name.modules.index_prices import IndexPriceSeries
+
+START_DATE = date(2000, 1, 3)
+DAYS = 365 * 25
+
+
+@pytest.fixture(scope="module")
+def spy_dates():
+    series = IndexPriceSeries(SPY_TICKER)
+    series.extend(
+        (START_DATE + timedelta(days=day), 10_000 + day)
+        for day in range(DAYS)
+        if (START_DATE + timedelta(days=day)).weekday() < 5
+    )
+    index_price_cache.set_series(series)
+    yield [START_DATE + timedelta(days=random.randrange(DAYS)) for _ in range(1_000)]
+    index_price_cache.clear()
+
+
+def bench_get_spy_prices_for_dates(benchmark, spy_dates):
+    loop = asyncio.new_event_loop()
+    try:
+        prices = benchmark(
+            lambda: loop.run_until_complete(get_spy_prices_for_dates(spy_dates, None))
+        )
+    finally:
+        loop.close()
+    assert prices
@@ -0,0 +1,169 @@
+"""
+Stores benchmark runs and fails when throughput regresses.
+
+Record a run from pytest-benchmark JSON and/or Locust's `--csv` stats:
+    python -m benchmarks.results record --label <name> \\
+        --micro micro.json --load load_stats.csv
+
+Compare the latest run with the one before it (or a labelled baseline) and exit
+non-zero if any throughput both runs measured dropped by more than the
+threshold:
+    python -m benchmarks.results compare --threshold 0.1 [--baseline <name>]
+
+Runs are appended to a JSON-lines store, one object per run. Only compare runs
+recorded on the same machine.
+"""
+
+import argparse
+import csv
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+from typing import List
+
+DEFAULT_STORE = Path(__file__).parent / "results" / "history.jsonl"
+
+
+def read_micro(path: str) -> Dict[str, float]:
+    """
+    Operations per second of each pytest-benchmark benchmark.
+    """
+
+    with open(path) as micro_file:
+        report = json.load(micro_file)
+    return {
+        f"micro:{benchmark['name']}": benchmark["stats"]["ops"]
+        for benchmark in report["benchmarks"]
+    }
+
+
+def read_load(path: str) -> Dict[str, float]:
+    """
+    Requests per second of each route in a Locust `*_stats.csv`.
+    """
+
+    with open(path, newline="") as load_file:
+        return {
+            f"load:{' '.join(filter(None, (row['Type'], row['Name'])))}": float(
+                row["Requests/s"]
+            )
+            for row in csv.DictReader(load_file)
+        }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_runs(store: Path) -> List[dict]:
+    if not store.exists():
+        return []
+    with open(store) as store_file:
+        return [json.loads(line) for line in store_file if line.strip()]
+
+
+def record(store: Path, label: str, throughput: Dict[str, float]) -> dict:
+    run = {
+        "label": label,
+        "recorded_at": int(time.time()),
+        "commit": _git_commit(),
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "throughput": throughput,
+    }
+    store.parent.mkdir(parents=True, exist_ok=True)
+    with open(store, "a") as store_file:
+        store_file.write(json.dumps(run) + "\n")
+    return run
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """
+    Describes every metric whose throughput fell by more than `threshold`
+    (a fraction) from `baseline` to `current`.
+    """
+
+    regressions = []
+    for name, before in sorted(baseline["throughput"].items()):
+        after = current["throughput"].get(name)
+        if after is None or not before:
+            continue
+        change = (after - before) / before
+        print(f"{name:<50} {before:>12.1f} -> {after:>12.1f}  {change:+7.1%}")
+        if change < -threshold:
+            regressions.append(f"{name}: {change:+.1%}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", type=Path, default=DEFAULT_STORE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record")
+    record_parser.add_argument("--label", required=True)
+    record_parser.add_argument("--micro", help="pytest-benchmark JSON report")
+    record_parser.add_argument("--load", help="Locust *_stats.csv")
+
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("--baseline", help="label of the baseline run")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        throughput = {}
+        if args.micro:
+            throughput.update(read_micro(args.micro))
+        if args.load:
+            throughput.update(read_load(args.load))
+        if not throughput:
+            parser.error("pass --micro and/or --load")
+        record(args.store, args.label, throughput)
+        print(f"Recorded {len(throughput)} metrics as {args.label!r}")
+        return 0
+
+    runs = load_runs(args.store)
+    if len(runs) < 2:
+        print("Need at least two recorded runs to compare")
+        return 1
+    current = runs[-1]
+    if args.baseline:
+        matches = [run for run in runs[:-1] if run["label"] == args.baseline]
+        if not matches:
+            print(f"No run labelled {args.baseline!r}")
+            return 1
+        baseline = matches[-1]
+    else:
+        baseline = runs[-2]
+
+    if baseline["machine"] != current["machine"]:
+        print(f"Warning: runs are from {baseline['machine']} and {current['machine']}")
+    print(
+        f"{baseline['label']} ({baseline['commit']}) -> "
+        f"{current['label']} ({current['commit']})"
+    )
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"Throughput regressed by more than {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# Production launcher: gunicorn managing uvicorn workers.
+#   gunicorn -c gunicorn.conf.py project_name.main:app
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from dotenv import dotenv_values
+
+# Read the way project_name/configs.py reads them: the environment overrides
+# project_name/.env. Importing configs here would freeze its values in the
+# master before WEB_CONCURRENCY is set below, and workers would inherit them.
+settings = {
+    **dotenv_values(os.path.join(os.path.dirname(__file__), "project_name", ".env")),
+    **os.environ,
+}
+# Each of the WEB_CONCURRENCY + EMAIL_WORKER_PROCESSES processes needs at least
+# MIN_PROCESS_CONNECTIONS (3, see project_name/db/engine.py) of the budget, so
+# the default worker count is capped to what it can serve.
+max_workers = int(settings.get("DB_CONNECTION_BUDGET", "75")) // 3 - int(
+    settings.get("EMAIL_WORKER_PROCESSES", "1")
+)
+if "WEB_CONCURRENCY" in settings:
+    workers = int(settings["WEB_CONCURRENCY"])
+else:
+    workers = max(min(multiprocessing.cpu_count(), max_workers), 1)
+# Workers read this to size their share of DB_CONNECTION_BUDGET.
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# Workers write metrics here so /metrics can aggregate across them. This must be
+# set before any worker imports prometheus_client.
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "project_name_metrics"),
+)
+
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = (
+    f"{os.environ.get('PROJECT_NAME_CAPS_HOST', '0.0.0.0')}:"
+    f"{os.environ.get('PROJECT_NAME_CAPS_PORT', '8080')}"
+)
+# Peers trusted to set X-Forwarded-For/-Proto. UvicornWorker passes this to
+# uvicorn, whose proxy headers support then reports the forwarded client
+# address, which the per-IP rate limits key on. Set it to the reverse proxy's
+# address (or "*" if only the proxy can reach the workers); otherwise every
+# request appears to come from the proxy and shares one bucket.
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers periodically to bound memory growth.
+max_requests = 10000
+max_requests_jitter = 1000
+
+
+def on_starting(server):
+    if workers < multiprocessing.cpu_count() and "WEB_CONCURRENCY" not in settings:
+        server.log.info(
+            "Running %d workers, not one per CPU (%d): DB_CONNECTION_BUDGET "
+            "allows no more",
+            workers,
+            multiprocessing.cpu_count(),
+        )
+    # Files left by a previous run would be summed into the new values.
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
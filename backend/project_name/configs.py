@@ -13,11 +13,139 @@ HASH_SECRET_KEY = env.get("HASH_SECRET_KEY")
 HASH_ALGORITHM = env.get("HASH_ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(env.get("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
+# "memory" limits each worker separately; "postgres" shares the buckets across
+# workers through the rate_limit_bucket table.
+RATE_LIMIT_BACKEND = env.get("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_ENABLED = env.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_MAX_KEYS = int(env.get("RATE_LIMIT_MAX_KEYS", "100000"))
+# Attempts per minute (login) or per hour (forgot password), which is also the
+# largest burst allowed.
+LOGIN_IP_RATE_LIMIT = int(env.get("LOGIN_IP_RATE_LIMIT", "30"))
+LOGIN_USERNAME_RATE_LIMIT = int(env.get("LOGIN_USERNAME_RATE_LIMIT", "10"))
+FORGOT_PASSWORD_IP_RATE_LIMIT = int(env.get("FORGOT_PASSWORD_IP_RATE_LIMIT", "20"))
+FORGOT_PASSWORD_ACCOUNT_RATE_LIMIT = int(
+    env.get("FORGOT_PASSWORD_ACCOUNT_RATE_LIMIT", "3")
+)
+
+# "thread" or "process"
+PASSWORD_HASH_POOL = env.get("PASSWORD_HASH_POOL", "thread")
+PASSWORD_HASH_WORKERS = int(env.get("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_QUEUE = int(env.get("PASSWORD_HASH_MAX_QUEUE", "64"))
+PASSWORD_HASH_REJECT_WHEN_SATURATED = (
+    env.get("PASSWORD_HASH_REJECT_WHEN_SATURATED", "true").lower() == "true"
+)
+
+# Per-process cache of authenticated users. Other workers only see changes once
+# their entry expires, so keep the TTL short.
+USER_CACHE_SIZE = int(env.get("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = int(env.get("USER_CACHE_TTL_SECONDS", "30"))
+
+# Cache of verified JWT claims; set the size to 0 to disable it.
+JWT_DECODE_CACHE_SIZE = int(env.get("JWT_DECODE_CACHE_SIZE", "10000"))
+JWT_DECODE_CACHE_TTL_SECONDS = int(env.get("JWT_DECODE_CACHE_TTL_SECONDS", "300"))
+
+# How soon other workers honour a logout or password change (the worker that
+# handled it does at once).
+TOKEN_REVOCATION_REFRESH_SECONDS = int(
+    env.get("TOKEN_REVOCATION_REFRESH_SECONDS", "30")
+)
+
 POSTGRES_USER = env.get("POSTGRES_USER")
 POSTGRES_PASSWORD = env.get("POSTGRES_PASSWORD")
 POSTGRES_HOST = env.get("POSTGRES_HOST")
 POSTGRES_PORT = int(env.get("POSTGRES_PORT"))
 POSTGRES_DB = env.get("POSTGRES_DB")
+# Where the sync engine (scheduler lock, scheduled jobs, email worker,
+# migrations) connects. Point these at Postgres itself when POSTGRES_HOST is
+# PgBouncer; they default to POSTGRES_HOST and POSTGRES_PORT.
+POSTGRES_DIRECT_HOST = env.get("POSTGRES_DIRECT_HOST", POSTGRES_HOST)
+POSTGRES_DIRECT_PORT = int(env.get("POSTGRES_DIRECT_PORT", POSTGRES_PORT))
+
+# Total connections this deployment may open, split equally between its
+# WEB_CONCURRENCY web workers and EMAIL_WORKER_PROCESSES email workers (see
+# db/engine.py). Set all three to the same values in every service.
+DB_CONNECTION_BUDGET = int(env.get("DB_CONNECTION_BUDGET", "75"))
+# Number of web worker processes; set by gunicorn.conf.py for its workers.
+WEB_CONCURRENCY = int(env.get("WEB_CONCURRENCY", "1"))
+EMAIL_WORKER_PROCESSES = int(env.get("EMAIL_WORKER_PROCESSES", "1"))
+
+DB_POOL_TIMEOUT_SECONDS = float(env.get("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(env.get("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = env.get("DB_POOL_PRE_PING", "true").lower() == "true"
+# Set when POSTGRES_HOST is PgBouncer in transaction mode: PgBouncer does the
+# request path's pooling (NullPool here) and asyncpg must not use prepared
+# statements. The scheduler lock is session-level, so the sync engine keeps its
+# own pool and connects to POSTGRES_DIRECT_HOST instead.
+DB_PGBOUNCER = env.get("DB_PGBOUNCER", "false").lower() == "true"
+
+# Expired reset password requests are deleted in batches of this many rows, at
+# most RESET_PASSWORD_PURGE_MAX_BATCHES per run; the rest wait for the next run.
+RESET_PASSWORD_PURGE_INTERVAL_MINUTES = int(
+    env.get("RESET_PASSWORD_PURGE_INTERVAL_MINUTES", "15")
+)
+RESET_PASSWORD_PURGE_BATCH_SIZE = int(
+    env.get("RESET_PASSWORD_PURGE_BATCH_SIZE", "1000")
+)
+RESET_PASSWORD_PURGE_MAX_BATCHES = int(
+    env.get("RESET_PASSWORD_PURGE_MAX_BATCHES", "100")
+)
+
+SCHEDULER_LEADER_RETRY_SECONDS = int(env.get("SCHEDULER_LEADER_RETRY_SECONDS", "15"))
+
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"; when
+# unset it is open, so only expose it on an internal network.
+METRICS_TOKEN = env.get("METRICS_TOKEN")
+
+# When set, every process writes its metrics here and /metrics aggregates them.
+# gunicorn.conf.py sets it for its workers.
+PROMETHEUS_MULTIPROC_DIR = env.get("PROMETHEUS_MULTIPROC_DIR")
+
+# "off", "warn" or "raise": check each request against its route's
+# @query_budget and for repeated (N+1) statements. Use "raise" in tests.
+QUERY_BUDGET_MODE = env.get("QUERY_BUDGET_MODE", "off")
+QUERY_BUDGET_MAX_REPEATS = int(env.get("QUERY_BUDGET_MAX_REPEATS", "3"))
+
+LOG_LEVEL = env.get("LOG_LEVEL", "INFO")
+# Records waiting for the logging thread; further records are dropped (and
+# counted) rather than blocking the caller.
+LOG_QUEUE_SIZE = int(env.get("LOG_QUEUE_SIZE", "10000"))
+# Comma-separated logger=rate pairs, e.g. "project_name.utils.query_budget=0.1",
+# keeping that fraction of the logger's (and its children's) records below ERROR.
+LOG_SAMPLE_RATES = env.get("LOG_SAMPLE_RATES", "")
+# Errors from the same place with the same exception type are logged at most
+# this many times per period; the rest are counted and reported with the next.
+LOG_REPEAT_LIMIT = int(env.get("LOG_REPEAT_LIMIT", "5"))
+LOG_REPEAT_PERIOD_SECONDS = int(env.get("LOG_REPEAT_PERIOD_SECONDS", "60"))
 
 SUPPORT_EMAIL = env.get("SUPPORT_EMAIL")
 SUPPORT_EMAIL_APP_PASSWORD = env.get("SUPPORT_EMAIL_APP_PASSWORD")
+
+# Point these at a local aiosmtpd (SMTP_USE_SSL=false, empty app password) to test.
+SMTP_HOST = env.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(env.get("SMTP_PORT", "465"))
+SMTP_USE_SSL = env.get("SMTP_USE_SSL", "true").lower() == "true"
+SMTP_POOL_SIZE = int(env.get("SMTP_POOL_SIZE", "2"))
+SMTP_KEEPALIVE_SECONDS = int(env.get("SMTP_KEEPALIVE_SECONDS", "30"))
+
+EMAIL_OUTBOX_BATCH_SIZE = int(env.get("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+EMAIL_OUTBOX_POLL_SECONDS = float(env.get("EMAIL_OUTBOX_POLL_SECONDS", "2"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(env.get("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(env.get("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = int(
+    env.get("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", "3600")
+)
+EMAIL_OUTBOX_REPORT_SECONDS = int(env.get("EMAIL_OUTBOX_REPORT_SECONDS", "60"))
+# The email worker serves its own /metrics on this port (0 to disable).
+EMAIL_WORKER_METRICS_PORT = int(env.get("EMAIL_WORKER_METRICS_PORT", "9101"))
+
+INDEX_PRICE_TICKERS = env.get("INDEX_PRICE_TICKERS", "SPY").split(",")
+# Daily OHLC CSV (Date,Open,High,Low,Close,Volume) per lower-cased ticker,
+# from {start} to {end} (YYYYMMDD, inclusive); the placeholders are optional.
+INDEX_PRICE_CSV_URL = env.get(
+    "INDEX_PRICE_CSV_URL",
+    "https://stooq.com/q/d/l/?s={ticker}.us&i=d&d1={start}&d2={end}",
+)
+# How often each worker picks up rows added by the daily backfill.
+INDEX_PRICE_CACHE_REFRESH_SECONDS = int(
+    env.get("INDEX_PRICE_CACHE_REFRESH_SECONDS", "900")
+)
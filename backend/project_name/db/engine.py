@@ -1,14 +1,95 @@
+from collections.abc import AsyncIterator
+from uuid import uuid4
+
 from sqlalchemy.engine import create_engine
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from project_name.configs import DB_CONNECTION_BUDGET
+from project_name.configs import DB_PGBOUNCER
+from project_name.configs import DB_POOL_PRE_PING
+from project_name.configs import DB_POOL_RECYCLE_SECONDS
+from project_name.configs import DB_POOL_TIMEOUT_SECONDS
+from project_name.configs import EMAIL_WORKER_PROCESSES
 from project_name.configs import POSTGRES_DB
+from project_name.configs import POSTGRES_DIRECT_HOST
+from project_name.configs import POSTGRES_DIRECT_PORT
 from project_name.configs import POSTGRES_HOST
 from project_name.configs import POSTGRES_PASSWORD
 from project_name.configs import POSTGRES_PORT
 from project_name.configs import POSTGRES_USER
+from project_name.configs import WEB_CONCURRENCY
+from project_name.db.pool import instrument_pool
+from project_name.db.pool import InstrumentedAsyncAdaptedQueuePool
+from project_name.db.pool import InstrumentedNullPool
+from project_name.db.pool import InstrumentedQueuePool
+
+SYNC_DB_DRIVER = "psycopg2"
+ASYNC_DB_DRIVER = "asyncpg"
 
 _ENGINE: Engine | None = None
+_ASYNC_ENGINE: AsyncEngine | None = None
+_SESSION_FACTORY: sessionmaker | None = None
+_ASYNC_SESSION_FACTORY: async_sessionmaker | None = None
+
+
+def get_pool_limits(connections: int) -> dict:
+    """
+    Splits a connection allowance into a persistent pool and burst overflow.
+    """
+
+    pool_size = max(connections * 2 // 3, 1)
+    return {"pool_size": pool_size, "max_overflow": max(connections - pool_size, 0)}
+
+
+# A web worker holds one sync connection for the scheduler lock and needs at
+# least one more for scheduled jobs and one for requests.
+MIN_PROCESS_CONNECTIONS = 3
+
+
+def get_process_connections(budget: int, processes: int) -> int:
+    """
+    Each process's equal share of the deployment's connection budget.
+    """
+
+    connections = budget // processes
+    if connections < MIN_PROCESS_CONNECTIONS:
+        raise ValueError(
+            f"DB_CONNECTION_BUDGET={budget} leaves {connections} connections for "
+            f"each of {processes} processes; at least {MIN_PROCESS_CONNECTIONS} "
+            "are needed"
+        )
+    return connections
+
+
+# Every process, web or email worker, may open at most an equal share of the
+# budget. In web workers the sync engine (scheduler lock, scheduled jobs) gets a
+# fifth of it, at least two, and requests use the rest. The email worker only
+# uses the sync engine, sized the same, and leaves the rest of its share unused.
+_PROCESS_CONNECTIONS = get_process_connections(
+    DB_CONNECTION_BUDGET, WEB_CONCURRENCY + EMAIL_WORKER_PROCESSES
+)
+_SYNC_CONNECTIONS = max(_PROCESS_CONNECTIONS // 5, 2)
+_ASYNC_CONNECTIONS = _PROCESS_CONNECTIONS - _SYNC_CONNECTIONS
+
+
+def get_pool_options(
+    name: str, connections: int, poolclass: type, pgbouncer: bool = DB_PGBOUNCER
+) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_logging_name": name}
+    if pgbouncer:
+        return {**options, "poolclass": InstrumentedNullPool}
+    return {
+        **options,
+        **get_pool_limits(connections),
+        "poolclass": poolclass,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+    }
 
 
 def build_connection_string(
@@ -17,16 +98,96 @@ def build_connection_string(
     host: str = POSTGRES_HOST,
     port: str = POSTGRES_PORT,
     db: str = POSTGRES_DB,
+    driver: str = SYNC_DB_DRIVER,
 ) -> str:
-    return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{db}"
+    return f"postgresql+{driver}://{user}:{password}@{host}:{port}/{db}"
 
 
 def get_sqlalchemy_engine() -> Engine:
+    """
+    Bypasses PgBouncer (see POSTGRES_DIRECT_HOST): the scheduler lock is held
+    for the life of a connection, which transaction pooling would break.
+    """
+
     global _ENGINE
     if _ENGINE is None:
-        connection_string = build_connection_string()
-        _ENGINE = create_engine(connection_string, pool_size=50, max_overflow=25)
+        connection_string = build_connection_string(
+            host=POSTGRES_DIRECT_HOST, port=POSTGRES_DIRECT_PORT
+        )
+        _ENGINE = create_engine(
+            connection_string,
+            **get_pool_options(
+                "sync", _SYNC_CONNECTIONS, InstrumentedQueuePool, pgbouncer=False
+            ),
+        )
+        instrument_pool(_ENGINE, "sync")
     return _ENGINE
 
 
-SessionFactory = sessionmaker(bind=get_sqlalchemy_engine())
+def get_sqlalchemy_async_engine() -> AsyncEngine:
+    global _ASYNC_ENGINE
+    if _ASYNC_ENGINE is None:
+        connection_string = build_connection_string(driver=ASYNC_DB_DRIVER)
+        connect_args = {}
+        if DB_PGBOUNCER:
+            # PgBouncer may hand each statement to a different server
+            # connection, so named prepared statements can't be reused.
+            connect_args = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        _ASYNC_ENGINE = create_async_engine(
+            connection_string,
+            connect_args=connect_args,
+            **get_pool_options(
+                "async", _ASYNC_CONNECTIONS, InstrumentedAsyncAdaptedQueuePool
+            ),
+        )
+        instrument_pool(_ASYNC_ENGINE.sync_engine, "async")
+    return _ASYNC_ENGINE
+
+
+def get_session_factory() -> sessionmaker:
+    """
+    Sessions for Alembic, scheduled jobs and standalone scripts, which run
+    outside the event loop.
+    """
+
+    global _SESSION_FACTORY
+    if _SESSION_FACTORY is None:
+        _SESSION_FACTORY = sessionmaker(bind=get_sqlalchemy_engine())
+    return _SESSION_FACTORY
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    global _ASYNC_SESSION_FACTORY
+    if _ASYNC_SESSION_FACTORY is None:
+        _ASYNC_SESSION_FACTORY = async_sessionmaker(
+            bind=get_sqlalchemy_async_engine(), expire_on_commit=False
+        )
+    return _ASYNC_SESSION_FACTORY
+
+
+async def dispose_engines() -> None:
+    """
+    Closes the pooled connections of whichever engines were created.
+    """
+
+    global _ENGINE, _ASYNC_ENGINE, _SESSION_FACTORY, _ASYNC_SESSION_FACTORY
+    if _ASYNC_ENGINE is not None:
+        await _ASYNC_ENGINE.dispose()
+    if _ENGINE is not None:
+        _ENGINE.dispose()
+    _ENGINE = _ASYNC_ENGINE = None
+    _SESSION_FACTORY = _ASYNC_SESSION_FACTORY = None
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """
+    FastAPI dependency providing one session per request. FastAPI caches
+    dependencies per request, so every `Depends(get_session)` in a request
+    (including those in auth dependencies) shares this session.
+    """
+    async with get_async_session_factory()() as session:
+        yield session
@@ -1,10 +1,16 @@
 import datetime
 
+from sqlalchemy import BigInteger
 from sqlalchemy import Boolean
+from sqlalchemy import Date
 from sqlalchemy import DateTime
+from sqlalchemy import Float
 from sqlalchemy import func
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import String
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
@@ -30,17 +36,245 @@ class User(Base):
     reset_password_requests = relationship(
         "ResetPasswordRequest", back_populates="user", cascade="all, delete-orphan"
     )
+    # passive_deletes leaves unloaded children to the foreign keys' ON DELETE
+    # CASCADE instead of loading them just to delete them.
+    preferences = relationship(
+        "UserPreferences",
+        back_populates="user",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    portfolios = relationship(
+        "Portfolio",
+        back_populates="user",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    transactions = relationship(
+        "Transaction",
+        back_populates="user",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # text_pattern_ops lets prefix (LIKE 'abc%') filters use the index under
+        # any collation.
+        Index(
+            "ix_user_username_pattern",
+            "username",
+            postgresql_ops={"username": "text_pattern_ops"},
+        ),
+        Index(
+            "ix_user_email_pattern",
+            "email",
+            postgresql_ops={"email": "text_pattern_ops"},
+        ),
+    )
+
 
 class ResetPasswordRequest(Base):
     __tablename__ = "reset_password_request"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     uuid_token: Mapped[str] = mapped_column(String, nullable=False, unique=True)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("user.id"), nullable=False, index=True
+    )
     expires_at: Mapped[datetime.datetime] = mapped_column(
-        DateTime, nullable=False, default=func.now() + datetime.timedelta(hours=1)
+        DateTime,
+        nullable=False,
+        default=func.now() + datetime.timedelta(hours=1),
+        index=True,
     )
 
     user = relationship("User", back_populates="reset_password_requests")
 
-    def is_expired(self) -> bool:
-        return self.expires_at < datetime.datetime.now()
+
+class UserPreferences(Base):
+    __tablename__ = "user_preferences"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False, unique=True
+    )
+    strategy_display_option: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    user = relationship("User", back_populates="preferences")
+
+
+class Portfolio(Base):
+    __tablename__ = "portfolio"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False
+    )
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    description: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=func.now(), nullable=False
+    )
+
+    user = relationship("User", back_populates="portfolios")
+    transactions = relationship(
+        "Transaction",
+        back_populates="portfolio",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # Covers joins from a user to their portfolios' ids.
+        Index("ix_portfolio_user_id", "user_id", postgresql_include=["id"]),
+    )
+
+
+class Transaction(Base):
+    __tablename__ = "transaction"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    portfolio_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("portfolio.id", ondelete="CASCADE"), nullable=False
+    )
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False
+    )
+    ticker: Mapped[str] = mapped_column(String, nullable=False)
+    price_cents: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    quantity: Mapped[float] = mapped_column(Float, nullable=False)
+    # "BUY" or "SELL"
+    transaction_type: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=func.now(), nullable=False
+    )
+    purchased_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
+
+    user = relationship("User", back_populates="transactions")
+    portfolio = relationship("Portfolio", back_populates="transactions")
+
+    __table_args__ = (
+        Index(
+            "ix_transaction_portfolio_id_purchased_at_created_at",
+            "portfolio_id",
+            "purchased_at",
+            "created_at",
+        ),
+        Index("ix_transaction_user_id_id", "user_id", "id"),
+    )
+
+
+class IndexPriceHistory(Base):
+    __tablename__ = "index_price_history"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    ticker: Mapped[str] = mapped_column(String, nullable=False)
+    date: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
+    open_price_cents: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        # Also the conflict target of the backfill's upsert.
+        Index(
+            "uq_index_price_history_ticker_date",
+            "ticker",
+            "date",
+            unique=True,
+            postgresql_include=["open_price_cents"],
+        ),
+    )
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    email_to: Mapped[str] = mapped_column(String, nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    next_attempt_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=func.now(), nullable=False
+    )
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=func.now(), nullable=False
+    )
+    sent_at: Mapped[datetime.datetime | None] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_email_outbox_pending_next_attempt_at",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+
+class PortfolioHoldingSnapshot(Base):
+    """
+    Position in one ticker of a portfolio at the end of each day on which that
+    ticker was traded. The latest row per ticker is also kept, while the
+    position is open, in PortfolioHolding.
+    """
+
+    __tablename__ = "portfolio_holding_snapshot"
+    portfolio_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("portfolio.id", ondelete="CASCADE"), primary_key=True
+    )
+    ticker: Mapped[str] = mapped_column(String, primary_key=True)
+    as_of: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
+    quantity: Mapped[float] = mapped_column(Float, nullable=False)
+    cost_basis_cents: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class PortfolioHolding(Base):
+    """
+    Current open position in one ticker of a portfolio: a copy of its latest
+    PortfolioHoldingSnapshot, maintained by replay_holdings. Closed positions
+    have no row, so a portfolio has one row per position it holds.
+    """
+
+    __tablename__ = "portfolio_holding"
+    portfolio_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("portfolio.id", ondelete="CASCADE"), primary_key=True
+    )
+    ticker: Mapped[str] = mapped_column(String, primary_key=True)
+    as_of: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+    quantity: Mapped[float] = mapped_column(Float, nullable=False)
+    cost_basis_cents: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class RateLimitBucket(Base):
+    """
+    Shared rate limit state, see utils/rate_limit.py. Unlogged: writes skip the
+    WAL, and losing the table in a crash only resets the limits.
+    """
+
+    __tablename__ = "rate_limit_bucket"
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    # Epoch seconds at which the bucket is full again.
+    tat: Mapped[float] = mapped_column(Float, nullable=False)
+
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+
+class TokenRevocationWatermark(Base):
+    """
+    Access tokens of `user_id` issued before `not_before` are revoked, see
+    utils/revocation.py. Not a foreign key: a deleted user's tokens must stay
+    revoked.
+    """
+
+    __tablename__ = "token_revocation_watermark"
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    # Epoch seconds, compared with the token's iat claim.
+    not_before: Mapped[float] = mapped_column(Float, nullable=False)
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=func.now(), nullable=False, index=True
+    )
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_token"
+    jti: Mapped[str] = mapped_column(String, primary_key=True)
+    # The token's exp claim; the row is useless afterwards.
+    expires_at: Mapped[float] = mapped_column(Float, nullable=False)
+    revoked_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=func.now(), nullable=False, index=True
+    )
@@ -0,0 +1,129 @@
+import time
+
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import QueuePool
+
+POOL_CHECKOUT_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection (or connecting, without a pool).",
+    ["pool"],
+    buckets=(
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+        30.0,
+    ),
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout.",
+    ["pool"],
+)
+POOL_CONNECTION_AGE_SECONDS = Histogram(
+    "db_pool_connection_age_seconds",
+    "Age of connections when they are checked out.",
+    ["pool"],
+    buckets=(1, 10, 60, 300, 900, 1800, 3600, 7200),
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently in use.",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections currently open beyond pool_size.",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured persistent pool size.",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+
+class _TimedCheckout:
+    """
+    Times `_do_get`, which is where a checkout blocks on a full pool. The pool
+    name comes from `pool_logging_name`, which survives `Pool.recreate()`.
+    """
+
+    def _do_get(self):
+        pool = self._orig_logging_name or "default"
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.labels(pool).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT_SECONDS.labels(pool).observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def instrument_pool(engine: Engine, name: str) -> None:
+    """
+    Keeps the in-use, overflow and size gauges of `engine`'s pool current and
+    records the age of every connection handed out.
+    """
+
+    checked_out = POOL_CHECKED_OUT.labels(name)
+    overflow = POOL_OVERFLOW.labels(name)
+    connection_age = POOL_CONNECTION_AGE_SECONDS.labels(name)
+
+    def update_overflow() -> None:
+        # QueuePool counts overflow from -pool_size; other pools have none.
+        if isinstance(engine.pool, QueuePool):
+            overflow.set(max(engine.pool.overflow(), 0))
+
+    if isinstance(engine.pool, QueuePool):
+        POOL_SIZE.labels(name).set(engine.pool.size())
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record) -> None:
+        connection_record.info["connected_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        checked_out.inc()
+        update_overflow()
+        connected_at = connection_record.info.get("connected_at")
+        if connected_at is not None:
+            connection_age.observe(time.monotonic() - connected_at)
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record) -> None:
+        checked_out.dec()
+        update_overflow()
@@ -0,0 +1,187 @@
+import datetime
+import signal
+import tempfile
+import time
+from dataclasses import dataclass
+from email.mime.multipart import MIMEMultipart
+
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import start_http_server
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from project_name.configs import EMAIL_OUTBOX_BACKOFF_SECONDS
+from project_name.configs import EMAIL_OUTBOX_BATCH_SIZE
+from project_name.configs import EMAIL_OUTBOX_MAX_ATTEMPTS
+from project_name.configs import EMAIL_OUTBOX_MAX_BACKOFF_SECONDS
+from project_name.configs import EMAIL_OUTBOX_POLL_SECONDS
+from project_name.configs import EMAIL_OUTBOX_REPORT_SECONDS
+from project_name.configs import EMAIL_WORKER_METRICS_PORT
+from project_name.db.engine import get_session_factory
+from project_name.db.models import EmailOutbox
+from project_name.modules.email.export import EXPORT_FILE_NAME
+from project_name.modules.email.export import export_user_data
+from project_name.modules.email.outbox import DATA_REQUEST_EMAIL
+from project_name.modules.email.outbox import RESET_PASSWORD_EMAIL
+from project_name.utils.email import create_data_request_email
+from project_name.utils.email import create_reset_password_email
+from project_name.utils.email import smtp_pool
+from project_name.utils.logging import setup_logger
+
+logger = setup_logger()
+
+OUTBOX_DELIVERIES = Counter(
+    "email_outbox_deliveries_total",
+    "Delivery attempts by outcome: sent, retried or failed (given up on).",
+    ["outcome"],
+)
+OUTBOX_PENDING = Gauge(
+    "email_outbox_pending",
+    "Emails waiting to be sent, as of the last report.",
+    multiprocess_mode="liveall",
+)
+OUTBOX_LAG_SECONDS = Gauge(
+    "email_outbox_lag_seconds",
+    "Age of the oldest pending email, as of the last report.",
+    multiprocess_mode="liveall",
+)
+
+
+@dataclass
+class OutboxStats:
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+def _render_message(db_session: Session, entry: EmailOutbox) -> MIMEMultipart:
+    if entry.kind == RESET_PASSWORD_EMAIL:
+        return create_reset_password_email(entry.email_to, entry.payload["uuid_token"])
+    if entry.kind == DATA_REQUEST_EMAIL:
+        # The export is streamed to disk; only the compressed file is read back.
+        with tempfile.TemporaryFile() as export_file:
+            export_user_data(db_session, entry.payload["user_id"], export_file)
+            export_file.seek(0)
+            attachment = export_file.read()
+        return create_data_request_email(entry.email_to, attachment, EXPORT_FILE_NAME)
+    raise ValueError(f"Unknown email kind: {entry.kind}")
+
+
+def _backoff(attempts: int) -> datetime.timedelta:
+    seconds = EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return datetime.timedelta(seconds=min(seconds, EMAIL_OUTBOX_MAX_BACKOFF_SECONDS))
+
+
+def process_batch(db_session: Session, stats: OutboxStats) -> int:
+    """
+    Claims and delivers one batch of due emails. Rows stay locked until the
+    commit, so concurrent workers skip them instead of sending duplicates, and
+    a crashed worker simply releases them back to the queue. Each email is
+    rendered in its own savepoint, so one that fails only rolls back itself.
+    All timestamps come from the database clock.
+    """
+
+    entries = db_session.scalars(
+        select(EmailOutbox)
+        .where(EmailOutbox.status == "pending")
+        .where(EmailOutbox.next_attempt_at <= func.now())
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(EMAIL_OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    for entry in entries:
+        entry.attempts += 1
+        try:
+            with db_session.begin_nested():
+                message = _render_message(db_session, entry)
+            smtp_pool.send(entry.email_to, message)
+        except Exception as e:
+            logger.exception("Failed to send email %s (%s)", entry.id, entry.kind)
+            entry.last_error = str(e)[:1000]
+            if entry.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+                entry.status = "failed"
+                stats.failed += 1
+                OUTBOX_DELIVERIES.labels("failed").inc()
+            else:
+                entry.next_attempt_at = func.now() + _backoff(entry.attempts)
+                stats.retried += 1
+                OUTBOX_DELIVERIES.labels("retried").inc()
+        else:
+            entry.status = "sent"
+            entry.sent_at = func.now()
+            stats.sent += 1
+            OUTBOX_DELIVERIES.labels("sent").inc()
+
+    db_session.commit()
+    return len(entries)
+
+
+def get_outbox_lag(db_session: Session) -> tuple[int, float]:
+    """
+    Returns the number of pending emails and the age in seconds of the oldest.
+    """
+
+    pending, lag = db_session.execute(
+        select(
+            func.count(EmailOutbox.id),
+            func.extract(
+                "epoch", func.localtimestamp() - func.min(EmailOutbox.created_at)
+            ),
+        ).where(EmailOutbox.status == "pending")
+    ).one()
+    return pending, float(lag or 0.0)
+
+
+def run() -> None:
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    if EMAIL_WORKER_METRICS_PORT:
+        start_http_server(EMAIL_WORKER_METRICS_PORT)
+
+    stats = OutboxStats()
+    last_report_at = time.monotonic()
+    sent_at_last_report = 0
+    logger.info("Email worker started")
+
+    while not stopping:
+        with get_session_factory()() as db_session:
+            processed = process_batch(db_session, stats)
+
+            elapsed = time.monotonic() - last_report_at
+            if elapsed >= EMAIL_OUTBOX_REPORT_SECONDS:
+                pending, lag = get_outbox_lag(db_session)
+                throughput = (stats.sent - sent_at_last_report) / elapsed
+                OUTBOX_PENDING.set(pending)
+                OUTBOX_LAG_SECONDS.set(lag)
+                logger.info(
+                    "Email outbox: %.2f sent/s, %d pending, %.1fs lag, "
+                    "%d sent, %d retried, %d failed",
+                    throughput,
+                    pending,
+                    lag,
+                    stats.sent,
+                    stats.retried,
+                    stats.failed,
+                )
+                last_report_at = time.monotonic()
+                sent_at_last_report = stats.sent
+
+        if processed < EMAIL_OUTBOX_BATCH_SIZE:
+            time.sleep(EMAIL_OUTBOX_POLL_SECONDS)
+
+    smtp_pool.close()
+    logger.info("Email worker stopped")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,163 @@
+import csv
+import io
+import logging
+from collections.abc import Iterable
+from collections.abc import Iterator
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from typing import Dict
+from typing import List
+from typing import TextIO
+from typing import Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from project_name.configs import INDEX_PRICE_CSV_URL
+from project_name.configs import INDEX_PRICE_TICKERS
+from project_name.db.engine import get_sqlalchemy_engine
+
+logger = logging.getLogger(__name__)
+
+# Fetched from on a ticker's first backfill, i.e. its whole history.
+HISTORY_START = date(1970, 1, 1)
+
+PriceRow = Tuple[str, date, int]
+
+
+def read_price_csv(csv_file: TextIO, ticker: str | None = None) -> Iterator[PriceRow]:
+    """
+    Parses either our own `ticker,date,open_price_cents` export or a daily OHLC
+    file (`Date,Open,...`, as served by INDEX_PRICE_CSV_URL) for `ticker`.
+    """
+
+    for row in csv.DictReader(csv_file):
+        if "open_price_cents" in row:
+            yield (
+                row["ticker"],
+                date.fromisoformat(row["date"]),
+                int(row["open_price_cents"]),
+            )
+        elif row.get("Open"):
+            yield ticker, date.fromisoformat(row["Date"]), round(
+                float(row["Open"]) * 100
+            )
+
+
+def fetch_prices(ticker: str, start: date = HISTORY_START) -> List[PriceRow]:
+    """
+    Fetches the prices of `ticker` from `start` to today.
+    """
+
+    # Only the scheduler leader ever fetches, so don't pay for requests (and
+    # its TLS stack) at every worker's startup.
+    import requests
+
+    url = INDEX_PRICE_CSV_URL.format(
+        ticker=ticker.lower(),
+        start=start.strftime("%Y%m%d"),
+        end=date.today().strftime("%Y%m%d"),
+    )
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    return list(read_price_csv(io.StringIO(response.text), ticker))
+
+
+def get_latest_dates(connection: Connection, tickers: List[str]) -> Dict[str, date]:
+    rows = connection.execute(
+        text(
+            "SELECT ticker, max(date) FROM index_price_history "
+            "WHERE ticker = ANY(:tickers) GROUP BY ticker"
+        ),
+        {"tickers": tickers},
+    )
+    return {ticker: latest.date() for ticker, latest in rows}
+
+
+def load_prices(connection: Connection, rows: Iterable[PriceRow]) -> int:
+    """
+    Bulk loads rows with COPY into a temporary staging table and upserts them
+    into index_price_history in a single statement.
+    """
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for ticker, day, open_price_cents in rows:
+        writer.writerow((ticker, day.isoformat(), open_price_cents))
+    buffer.seek(0)
+
+    connection.execute(
+        text(
+            "CREATE TEMPORARY TABLE index_price_staging ("
+            "ticker varchar NOT NULL, date timestamp NOT NULL, "
+            "open_price_cents bigint NOT NULL)"
+        )
+    )
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY index_price_staging (ticker, date, open_price_cents) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+    result = connection.execute(
+        text(
+            "INSERT INTO index_price_history (ticker, date, open_price_cents) "
+            "SELECT DISTINCT ON (ticker, date) ticker, date, open_price_cents "
+            "FROM index_price_staging ORDER BY ticker, date "
+            "ON CONFLICT (ticker, date) "
+            "DO UPDATE SET open_price_cents = EXCLUDED.open_price_cents"
+        )
+    )
+    connection.execute(text("DROP TABLE index_price_staging"))
+    return result.rowcount
+
+
+def backfill_index_prices(
+    tickers: List[str] = INDEX_PRICE_TICKERS, csv_path: str | None = None
+) -> int:
+    """
+    Loads prices newer than the latest stored date of each ticker, either from
+    the remote price source or from a local CSV file.
+    """
+
+    started = datetime.now()
+    with get_sqlalchemy_engine().connect() as connection:
+        latest_dates = get_latest_dates(connection, tickers)
+
+    # Fetched without holding a connection; only days after the latest stored
+    # one are requested.
+    if csv_path:
+        with open(csv_path, newline="") as csv_file:
+            rows = list(read_price_csv(csv_file, tickers[0]))
+    else:
+        rows = []
+        for ticker in tickers:
+            latest = latest_dates.get(ticker)
+            if latest is None:
+                rows.extend(fetch_prices(ticker))
+            elif latest < date.today():
+                rows.extend(fetch_prices(ticker, latest + timedelta(days=1)))
+
+    new_rows = [
+        row
+        for row in rows
+        if row[0] in tickers
+        and (row[0] not in latest_dates or row[1] > latest_dates[row[0]])
+    ]
+    loaded = 0
+    if new_rows:
+        with get_sqlalchemy_engine().begin() as connection:
+            loaded = load_prices(connection, new_rows)
+
+    logger.info(
+        "Backfilled %d index prices for %s in %.3fs",
+        loaded,
+        ",".join(tickers),
+        (datetime.now() - started).total_seconds(),
+    )
+    return loaded
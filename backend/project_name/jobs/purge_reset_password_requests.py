@@ -0,0 +1,64 @@
+import logging
+import time
+
+from prometheus_client import Counter
+from prometheus_client import Histogram
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import select
+
+from project_name.configs import RESET_PASSWORD_PURGE_BATCH_SIZE
+from project_name.configs import RESET_PASSWORD_PURGE_MAX_BATCHES
+from project_name.db.engine import get_sqlalchemy_engine
+from project_name.db.models import ResetPasswordRequest
+
+logger = logging.getLogger(__name__)
+
+RESET_PASSWORD_REQUESTS_PURGED = Counter(
+    "reset_password_requests_purged_total",
+    "Expired reset password requests deleted by the purge job.",
+)
+RESET_PASSWORD_PURGE_SECONDS = Histogram(
+    "reset_password_purge_duration_seconds",
+    "Duration of each run of the reset password request purge job.",
+)
+
+
+def purge_expired_reset_password_requests(
+    batch_size: int = RESET_PASSWORD_PURGE_BATCH_SIZE,
+    max_batches: int = RESET_PASSWORD_PURGE_MAX_BATCHES,
+) -> int:
+    """
+    Deletes expired reset password requests, oldest first, one batch per
+    transaction so that no run holds locks on (or bloats WAL with) more than
+    `batch_size` rows at a time. Stops after `max_batches`; the next run picks
+    up the rest.
+    """
+
+    expired_ids = (
+        select(ResetPasswordRequest.id)
+        .where(ResetPasswordRequest.expires_at <= func.now())
+        .order_by(ResetPasswordRequest.expires_at)
+        .limit(batch_size)
+        # Rows a concurrent reset is deleting are left to that transaction.
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    statement = delete(ResetPasswordRequest).where(
+        ResetPasswordRequest.id.in_(expired_ids)
+    )
+
+    started = time.perf_counter()
+    purged = 0
+    for _ in range(max_batches):
+        with get_sqlalchemy_engine().begin() as connection:
+            deleted = connection.execute(statement).rowcount
+        purged += deleted
+        if deleted < batch_size:
+            break
+
+    duration = time.perf_counter() - started
+    RESET_PASSWORD_REQUESTS_PURGED.inc(purged)
+    RESET_PASSWORD_PURGE_SECONDS.observe(duration)
+    logger.info("Purged %d expired reset password requests in %.3fs", purged, duration)
+    return purged
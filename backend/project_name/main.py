@@ -1,30 +1,134 @@
-import uvicorn
+import asyncio
+from contextlib import asynccontextmanager
+
 from apscheduler.schedulers.background import BackgroundScheduler
 from fastapi import FastAPI
 from fastapi import Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pytz import timezone
 
 from project_name.configs import PROJECT_NAME_CAPS_HOST
 from project_name.configs import PROJECT_NAME_CAPS_PORT
+from project_name.configs import QUERY_BUDGET_MAX_REPEATS
+from project_name.configs import QUERY_BUDGET_MODE
+from project_name.configs import RATE_LIMIT_BACKEND
+from project_name.configs import RESET_PASSWORD_PURGE_INTERVAL_MINUTES
+from project_name.configs import SCHEDULER_LEADER_RETRY_SECONDS
+from project_name.db.engine import dispose_engines
+from project_name.db.engine import get_async_session_factory
+from project_name.db.engine import get_sqlalchemy_engine
+from project_name.jobs.backfill_index_prices import backfill_index_prices
+from project_name.jobs.purge_reset_password_requests import (
+    purge_expired_reset_password_requests,
+)
 from project_name.modules.auth.api import router as auth_router
+from project_name.modules.common import SPY_TICKER
 from project_name.modules.email.api import router as email_router
+from project_name.modules.index_prices import index_price_cache
+from project_name.modules.metrics.api import router as metrics_router
 from project_name.modules.user.api import router as user_router
+from project_name.utils.hashing import password_hasher
 from project_name.utils.logging import setup_logger
+from project_name.utils.metrics import MetricsMiddleware
+from project_name.utils.query_budget import QueryBudgetMiddleware
+from project_name.utils.rate_limit import purge_rate_limit_buckets
+from project_name.utils.revocation import purge_token_revocations
+from project_name.utils.revocation import token_revocations
+from project_name.utils.scheduler import SchedulerLeaderElection
 
 logger = setup_logger()
 
 
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    # Jobs only run in the worker that wins the scheduler lock.
+    scheduler = application.state.scheduler
+    # Engines are created lazily so that importing the app stays cheap; build
+    # the request path's one here rather than on the first request.
+    async_session_factory = get_async_session_factory()
+    # Load the SPY series now so the first performance request doesn't pay for
+    # it. A failure only leaves that to the first request.
+    try:
+        async with async_session_factory() as db_session:
+            await index_price_cache.refresh(db_session, SPY_TICKER)
+    except Exception:
+        logger.exception("Failed to warm the %s price cache", SPY_TICKER)
+    # Fails startup rather than serve requests without the revocation list.
+    await token_revocations.load()
+    revocation_refresh = asyncio.create_task(token_revocations.run())
+    leader_election = SchedulerLeaderElection(
+        scheduler, get_sqlalchemy_engine(), SCHEDULER_LEADER_RETRY_SECONDS
+    )
+    scheduler.start(paused=True)
+    leader_election.start()
+    yield
+    revocation_refresh.cancel()
+    leader_election.stop()
+    scheduler.shutdown(wait=False)
+    password_hasher.shutdown()
+    await dispose_engines()
+
+
 def get_application() -> FastAPI:
-    application = FastAPI(root_path="/api", redirect_slashes=True)
+    application = FastAPI(
+        root_path="/api",
+        redirect_slashes=True,
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
     scheduler = BackgroundScheduler()
+    application.state.scheduler = scheduler
+
+    # Scheduled jobs
+    market_timezone = timezone("US/Eastern")
+    scheduler.add_job(
+        backfill_index_prices,
+        "cron",
+        day_of_week="mon-fri",
+        hour=18,
+        timezone=market_timezone,
+        id="backfill_index_prices",
+        coalesce=True,
+        # A run missed while this worker waited for the scheduler lock (e.g.
+        # during a failover) is still caught up within the same evening.
+        misfire_grace_time=6 * 60 * 60,
+        max_instances=1,
+    )
+
+    scheduler.add_job(
+        purge_expired_reset_password_requests,
+        "interval",
+        minutes=RESET_PASSWORD_PURGE_INTERVAL_MINUTES,
+        id="purge_expired_reset_password_requests",
+        coalesce=True,
+        max_instances=1,
+    )
+    scheduler.add_job(
+        purge_token_revocations,
+        "interval",
+        hours=1,
+        id="purge_token_revocations",
+        coalesce=True,
+        max_instances=1,
+    )
+    if RATE_LIMIT_BACKEND == "postgres":
+        scheduler.add_job(
+            purge_rate_limit_buckets,
+            "interval",
+            hours=1,
+            id="purge_rate_limit_buckets",
+            coalesce=True,
+            max_instances=1,
+        )
 
     # API Routes
     application.include_router(auth_router)
     application.include_router(user_router)
     application.include_router(email_router)
+    application.include_router(metrics_router)
 
     # Middleware
     application.add_middleware(
@@ -34,13 +138,21 @@ def get_application() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if QUERY_BUDGET_MODE != "off":
+        application.add_middleware(
+            QueryBudgetMiddleware,
+            raise_on_violation=QUERY_BUDGET_MODE == "raise",
+            max_repeats=QUERY_BUDGET_MAX_REPEATS,
+        )
+    # Added last so it is outermost and also times CORS preflights.
+    application.add_middleware(MetricsMiddleware)
 
     @application.exception_handler(RequestValidationError)
     async def validation_exception_handler(
         request: Request, exc: RequestValidationError
     ):
         exc_str = f"{exc}".replace("\n", " ").replace("   ", " ")
-        logger.exception(f"{request}: {exc_str}")
+        logger.exception("%s: %s", request, exc_str)
         return JSONResponse(
             status_code=422,
             content={"message": exc_str, "data": None},
@@ -49,7 +161,7 @@ def get_application() -> FastAPI:
     @application.exception_handler(ValueError)
     async def value_error_handler(request: Request, exc: ValueError):
         exc_str = f"{exc}".replace("\n", " ").replace("   ", " ")
-        logger.exception(f"{request}: {exc_str}")
+        logger.exception("%s: %s", request, exc_str)
         return JSONResponse(
             status_code=400,
             content={"message": exc_str, "data": None},
@@ -61,7 +173,11 @@ def get_application() -> FastAPI:
 app = get_application()
 
 if __name__ == "__main__":
+    import uvicorn
+
     logger.info(
-        f"Starting project_name on http://{PROJECT_NAME_CAPS_HOST}:{str(PROJECT_NAME_CAPS_PORT)}/"
+        "Starting project_name on http://%s:%s/",
+        PROJECT_NAME_CAPS_HOST,
+        PROJECT_NAME_CAPS_PORT,
     )
     uvicorn.run(app, host=PROJECT_NAME_CAPS_HOST, port=PROJECT_NAME_CAPS_PORT)
@@ -1,16 +1,22 @@
 import uuid
 from datetime import timedelta
+from typing import Annotated
 
 from fastapi import APIRouter
-from fastapi import BackgroundTasks
+from fastapi import Cookie
+from fastapi import Depends
 from fastapi import HTTPException
+from fastapi import Request
 from fastapi import Response
 from fastapi import status
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from project_name.configs import ACCESS_TOKEN_EXPIRE_MINUTES
-from project_name.db.engine import get_sqlalchemy_engine
+from project_name.db.engine import get_session
 from project_name.db.models import ResetPasswordRequest
 from project_name.db.models import User
 from project_name.modules.auth.models import CreateUserRequest
@@ -18,25 +24,50 @@ from project_name.modules.auth.models import ForgotPasswordRequest
 from project_name.modules.auth.models import LoginRequest
 from project_name.modules.auth.models import ResetPasswordUserRequest
 from project_name.modules.auth.models import Token
+from project_name.modules.email.outbox import enqueue_email
+from project_name.modules.email.outbox import RESET_PASSWORD_EMAIL
 from project_name.utils.auth import authenticate_user
 from project_name.utils.auth import create_access_token
-from project_name.utils.auth import get_password_hash
-from project_name.utils.email import send_reset_password_email
+from project_name.utils.auth import decode_access_token
+from project_name.utils.auth import invalidate_cached_user
+from project_name.utils.hashing import password_hasher
+from project_name.utils.query_budget import query_budget
+from project_name.utils.rate_limit import FORGOT_PASSWORD_ACCOUNT_LIMIT
+from project_name.utils.rate_limit import FORGOT_PASSWORD_IP_LIMIT
+from project_name.utils.rate_limit import LOGIN_IP_LIMIT
+from project_name.utils.rate_limit import LOGIN_USERNAME_LIMIT
+from project_name.utils.rate_limit import rate_limiter
+from project_name.utils.revocation import token_revocations
 from project_name.utils.validation import is_valid_email
 
 router = APIRouter(prefix="/auth")
 
+
+def _client_ip(request: Request) -> str | None:
+    # Behind a reverse proxy this is the proxy's address unless it is listed
+    # in FORWARDED_ALLOW_IPS (see gunicorn.conf.py), in which case uvicorn has
+    # already replaced it with the client's from X-Forwarded-For.
+    return request.client.host if request.client else None
+
+
 """
 Handle token requests.
 """
 
 
 @router.post("/token")
+@query_budget(3)
 async def login_for_access_token(
     data: LoginRequest,
+    request: Request,
     response: Response,
+    db_session: AsyncSession = Depends(get_session),
 ) -> Token:
-    user = authenticate_user(data.username, data.password)
+    await rate_limiter.check(
+        (LOGIN_IP_LIMIT, _client_ip(request)),
+        (LOGIN_USERNAME_LIMIT, data.username),
+    )
+    user = await authenticate_user(data.username, data.password, db_session)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,7 +76,8 @@ async def login_for_access_token(
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id},
+        expires_delta=access_token_expires,
     )
     response.set_cookie(
         key="access_token",
@@ -57,9 +89,11 @@ async def login_for_access_token(
 
 
 @router.post("/register")
+@query_budget(1)
 async def register_user(
     data: CreateUserRequest,
     response: Response,
+    db_session: AsyncSession = Depends(get_session),
 ) -> Token:
     if data.password != data.confirm_password:
         raise HTTPException(
@@ -85,57 +119,57 @@ async def register_user(
             detail="Invalid email",
         )
 
+    hashed_password = await password_hasher.hash(data.password)
+
     try:
-        with Session(get_sqlalchemy_engine()) as db_session:
-            user = User(
-                username=data.username,
-                email=data.email,
-                hashed_password=get_password_hash(data.password),
-                is_admin=True,
-            )
-
-            db_session.add(user)
-            db_session.commit()
-
-            access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-            access_token = create_access_token(
-                data={"sub": user.username}, expires_delta=access_token_expires
-            )
-            response.set_cookie(
-                key="access_token",
-                value=access_token,
-                httponly=True,
-                max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-            )
-            return Token(access_token=access_token, token_type="bearer")
+        user = User(
+            username=data.username,
+            email=data.email,
+            hashed_password=hashed_password,
+            is_admin=True,
+        )
+
+        db_session.add(user)
+        await db_session.commit()
 
     except IntegrityError:
+        await db_session.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username or email already exists",
         )
 
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.username, "uid": user.id},
+        expires_delta=access_token_expires,
+    )
+    response.set_cookie(
+        key="access_token",
+        value=access_token,
+        httponly=True,
+        max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    )
+    return Token(access_token=access_token, token_type="bearer")
+
 
 @router.post("/forgot-password")
+@query_budget(6)
 async def forgot_password(
     data: ForgotPasswordRequest,
-    background_tasks: BackgroundTasks,
+    request: Request,
+    db_session: AsyncSession = Depends(get_session),
 ):
-    user = None
+    await rate_limiter.check(
+        (FORGOT_PASSWORD_IP_LIMIT, _client_ip(request)),
+        (FORGOT_PASSWORD_ACCOUNT_LIMIT, data.email_or_username),
+    )
     if is_valid_email(data.email_or_username):
-        with Session(get_sqlalchemy_engine()) as db_session:
-            user = (
-                db_session.query(User).filter_by(email=data.email_or_username).first()
-            )
-            db_session.close()
+        user_filter = User.email == data.email_or_username
     else:
-        with Session(get_sqlalchemy_engine()) as db_session:
-            user = (
-                db_session.query(User)
-                .filter_by(username=data.email_or_username)
-                .first()
-            )
-            db_session.close()
+        user_filter = User.username == data.email_or_username
+
+    user = await db_session.scalar(select(User).where(user_filter))
 
     if not user:
         raise HTTPException(
@@ -145,64 +179,90 @@ async def forgot_password(
 
     else:
         uuid_token = str(uuid.uuid4())
-        with Session(get_sqlalchemy_engine()) as db_session:
-            # Delete any existing reset password requests for the user
-            db_session.query(ResetPasswordRequest).filter_by(user_id=user.id).delete()
-
-            # Create a new reset password request
-            reset_password_request = ResetPasswordRequest(
-                user_id=user.id, uuid_token=uuid_token
-            )
-            db_session.add(reset_password_request)
-            db_session.commit()
-
-        background_tasks.add_task(
-            send_reset_password_email,
-            user.email,
-            uuid_token,
+
+        # Delete any existing reset password requests for the user
+        await db_session.execute(
+            delete(ResetPasswordRequest).where(ResetPasswordRequest.user_id == user.id)
         )
 
+        # Create a new reset password request
+        reset_password_request = ResetPasswordRequest(
+            user_id=user.id, uuid_token=uuid_token
+        )
+        db_session.add(reset_password_request)
+        enqueue_email(
+            db_session, RESET_PASSWORD_EMAIL, user.email, {"uuid_token": uuid_token}
+        )
+        await db_session.commit()
+
         return {"message": "Reset password email sent"}
 
 
 @router.post("/reset-password")
+@query_budget(5)
 async def reset_password(
     data: ResetPasswordUserRequest,
     response: Response,
+    db_session: AsyncSession = Depends(get_session),
 ):
-    with Session(get_sqlalchemy_engine()) as db_session:
-        reset_password_request = (
-            db_session.query(ResetPasswordRequest)
-            .filter_by(uuid_token=data.reset_password_request_id)
-            .first()
+    reset_password_request = await db_session.scalar(
+        select(ResetPasswordRequest).where(
+            ResetPasswordRequest.uuid_token == data.reset_password_request_id,
+            # Compared in the database, which also set expires_at, so both
+            # sides use the same clock.
+            ResetPasswordRequest.expires_at > func.now(),
         )
+    )
 
-        if not reset_password_request or reset_password_request.is_expired():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid or expired token",
-            )
+    if not reset_password_request:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or expired token",
+        )
 
-        if data.password != data.confirm_password:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Passwords do not match",
-            )
+    if data.password != data.confirm_password:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Passwords do not match",
+        )
+
+    user = await db_session.get(User, reset_password_request.user_id)
 
-        user = (
-            db_session.query(User).filter_by(id=reset_password_request.user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not find user associated with token",
         )
 
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Could not find user associated with token",
-            )
+    user.hashed_password = await password_hasher.hash(data.password)
+    await db_session.delete(reset_password_request)
+    await token_revocations.revoke_user_tokens(db_session, user.id)
+    await db_session.commit()
+    invalidate_cached_user(user.username)
 
-        user.hashed_password = get_password_hash(data.password)
-        db_session.delete(reset_password_request)
-        db_session.commit()
+    response.delete_cookie(key="access_token")
+
+    return {"message": "Password reset successfully"}
+
+
+@router.post("/logout")
+@query_budget(1)
+async def logout(
+    response: Response,
+    access_token: Annotated[str | None, Cookie()] = None,
+    db_session: AsyncSession = Depends(get_session),
+):
+    from jose import JWTError
 
-        response.delete_cookie(key="access_token")
+    if access_token is not None:
+        try:
+            claims = decode_access_token(access_token)
+        except JWTError:
+            claims = None
+        # Tokens without a jti are already rejected by get_current_user.
+        if claims is not None and "jti" in claims:
+            await token_revocations.revoke_token(db_session, claims)
+            await db_session.commit()
 
-        return {"message": "Password reset successfully"}
+    response.delete_cookie(key="access_token")
+    return {"message": "Logged out"}
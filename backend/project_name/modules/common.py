@@ -2,25 +2,26 @@ from datetime import date
 from datetime import datetime
 from typing import Dict
 from typing import List
-from typing import Optional
 
 from fastapi import HTTPException
 from fastapi import status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from project_name.db.engine import get_sqlalchemy_engine
-from project_name.db.models import IndexPriceHistory
 from project_name.db.models import Portfolio
+from project_name.db.models import PortfolioHolding
 from project_name.db.models import Transaction
 from project_name.db.models import User
+from project_name.modules.holdings import get_current_holdings
+from project_name.modules.index_prices import index_price_cache
 
+SPY_TICKER = "SPY"
 
-def get_all_portfolio_transactions(
-    portfolio_id: int, current_user: User, db_session: Optional[Session] = None
-) -> List[Transaction]:
 
-    db_session = db_session or Session(get_sqlalchemy_engine())
-    portfolio = db_session.query(Portfolio).filter(Portfolio.id == portfolio_id).first()
+async def _get_user_portfolio(
+    portfolio_id: int, current_user: User, db_session: AsyncSession
+) -> Portfolio:
+    portfolio = await db_session.get(Portfolio, portfolio_id)
 
     if not portfolio or portfolio.user_id != current_user.id:
         raise HTTPException(
@@ -28,38 +29,52 @@ def get_all_portfolio_transactions(
             detail="Portfolio not found",
         )
 
-    return (
-        db_session.query(Transaction)
-        .filter(Transaction.portfolio_id == portfolio.id)
+    return portfolio
+
+
+async def get_all_portfolio_transactions(
+    portfolio_id: int, current_user: User, db_session: AsyncSession
+) -> List[Transaction]:
+
+    portfolio = await _get_user_portfolio(portfolio_id, current_user, db_session)
+
+    transactions = await db_session.scalars(
+        select(Transaction)
+        .where(Transaction.portfolio_id == portfolio.id)
         .order_by(Transaction.purchased_at.asc(), Transaction.created_at.asc())
-        .all()
     )
+    return list(transactions)
 
 
-def get_all_transactions(current_user: User) -> List[Transaction]:
-    with Session(get_sqlalchemy_engine()) as db_session:
-        return (
-            db_session.query(Transaction)
-            .join(Portfolio)
-            .filter(Portfolio.user_id == current_user.id)
-            .order_by(Transaction.purchased_at.asc(), Transaction.created_at.asc())
-            .all()
-        )
+async def get_all_transactions(
+    current_user: User, db_session: AsyncSession
+) -> List[Transaction]:
+    transactions = await db_session.scalars(
+        select(Transaction)
+        .join(Portfolio)
+        .where(Portfolio.user_id == current_user.id)
+        .order_by(Transaction.purchased_at.asc(), Transaction.created_at.asc())
+    )
+    return list(transactions)
+
+
+async def get_portfolio_holdings(
+    portfolio_id: int, current_user: User, db_session: AsyncSession
+) -> List[PortfolioHolding]:
+    """
+    Retrieves the current holdings of a portfolio from its maintained positions
+    instead of replaying its transaction history.
+    """
+
+    portfolio = await _get_user_portfolio(portfolio_id, current_user, db_session)
+    return await get_current_holdings(db_session, portfolio.id)
 
 
-def get_spy_prices_for_dates(
-    dates: List[date], db_session: Optional[Session] = None
+async def get_spy_prices_for_dates(
+    dates: List[date], db_session: AsyncSession
 ) -> Dict[datetime, int]:
     """
     Retrieves the SPY prices for the dates of the given transactions.
     """
 
-    db_session = db_session or Session(get_sqlalchemy_engine())
-
-    spy_prices = (
-        db_session.query(IndexPriceHistory)
-        .filter(IndexPriceHistory.ticker == "SPY")
-        .filter(IndexPriceHistory.date.in_(dates))
-        .all()
-    )
-    return {price.date.date(): price.open_price_cents for price in spy_prices}
+    return await index_price_cache.prices_for_dates(db_session, SPY_TICKER, dates)
@@ -0,0 +1,111 @@
+import gzip
+import json
+from typing import BinaryIO
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from project_name.db.models import Portfolio
+from project_name.db.models import Transaction
+from project_name.modules.repository import select_user_with_preferences
+
+EXPORT_FILE_NAME = "data.ndjson.gz"
+EXPORT_BATCH_SIZE = 1000
+
+
+def _timestamp(value) -> int:
+    return int(value.timestamp())
+
+
+def _write_record(export_file, record_type: str, record: dict) -> None:
+    export_file.write(json.dumps({"type": record_type, **record}).encode("utf-8"))
+    export_file.write(b"\n")
+
+
+def export_user_data(db_session: Session, user_id: int, output: BinaryIO) -> None:
+    """
+    Writes a user's data to `output` as gzip-compressed NDJSON, one record per
+    line. Portfolios and transactions are streamed from server-side cursors in
+    batches of EXPORT_BATCH_SIZE rows, so memory use does not grow with the
+    size of the account.
+    """
+
+    with gzip.GzipFile(fileobj=output, mode="wb") as export_file:
+        user = db_session.scalar(select_user_with_preferences(user_id))
+        _write_record(
+            export_file,
+            "user_info",
+            {
+                "id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "created_at": _timestamp(user.created_at),
+            },
+        )
+        _write_record(
+            export_file,
+            "user_preferences",
+            {
+                "strategy_display_option": (
+                    user.preferences.strategy_display_option
+                    if user.preferences is not None
+                    else None
+                )
+            },
+        )
+
+        portfolios = db_session.execute(
+            select(
+                Portfolio.id,
+                Portfolio.name,
+                Portfolio.description,
+                Portfolio.created_at,
+            )
+            .where(Portfolio.user_id == user_id)
+            .order_by(Portfolio.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        for portfolio in portfolios:
+            _write_record(
+                export_file,
+                "portfolio",
+                {
+                    "id": portfolio.id,
+                    "name": portfolio.name,
+                    "description": portfolio.description,
+                    "created_at": _timestamp(portfolio.created_at),
+                },
+            )
+
+        transactions = db_session.execute(
+            select(
+                Transaction.id,
+                Transaction.portfolio_id,
+                Transaction.user_id,
+                Transaction.ticker,
+                Transaction.price_cents,
+                Transaction.quantity,
+                Transaction.transaction_type,
+                Transaction.created_at,
+                Transaction.purchased_at,
+            )
+            .where(Transaction.user_id == user_id)
+            .order_by(Transaction.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        for transaction in transactions:
+            _write_record(
+                export_file,
+                "transaction",
+                {
+                    "id": transaction.id,
+                    "portfolio_id": transaction.portfolio_id,
+                    "user_id": transaction.user_id,
+                    "ticker": transaction.ticker,
+                    "price_cents": transaction.price_cents,
+                    "quantity": transaction.quantity,
+                    "transaction_type": transaction.transaction_type,
+                    "created_at": _timestamp(transaction.created_at),
+                    "purchased_at": _timestamp(transaction.purchased_at),
+                },
+            )
@@ -0,0 +1,20 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from project_name.db.models import EmailOutbox
+
+RESET_PASSWORD_EMAIL = "reset_password"
+DATA_REQUEST_EMAIL = "data_request"
+
+
+def enqueue_email(
+    db_session: AsyncSession | Session, kind: str, email_to: str, payload: dict
+) -> EmailOutbox:
+    """
+    Adds an email to the outbox. It is only delivered once the caller commits,
+    so the email is sent if and only if the surrounding transaction succeeds.
+    """
+
+    entry = EmailOutbox(kind=kind, email_to=email_to, payload=payload)
+    db_session.add(entry)
+    return entry
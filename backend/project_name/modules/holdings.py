@@ -0,0 +1,240 @@
+import datetime
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from sqlalchemy import delete
+from sqlalchemy import event
+from sqlalchemy import insert
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from project_name.db.models import PortfolioHolding
+from project_name.db.models import PortfolioHoldingSnapshot
+from project_name.db.models import Transaction
+
+SELL_TRANSACTION_TYPE = "SELL"
+
+# First key of the two-key pg_advisory_xact_lock taken per portfolio; the
+# two-key space is separate from the single-key locks (e.g. the scheduler's).
+HOLDINGS_LOCK_NAMESPACE = 1_101
+
+# Quantities are floats: buying 0.1 and 0.2 and selling 0.3 leaves about 1e-17
+# shares, which must count as a closed position.
+QUANTITY_TOLERANCE = 1e-9
+
+_snapshot = PortfolioHoldingSnapshot.__table__
+_holding = PortfolioHolding.__table__
+
+
+def lock_portfolio_holdings(connection: Connection, portfolio_id: int) -> None:
+    """
+    Serializes snapshot replays of a portfolio until the transaction ends, so
+    two concurrent replays can't both delete and then both insert the same
+    snapshots. A no-op on databases without advisory locks.
+    """
+
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :portfolio_id)"),
+            {"namespace": HOLDINGS_LOCK_NAMESPACE, "portfolio_id": portfolio_id},
+        )
+
+
+def _apply_transaction(
+    quantity: float,
+    cost_basis_cents: float,
+    transaction_type: str,
+    transaction_quantity: float,
+    price_cents: int,
+) -> Tuple[float, float]:
+    if transaction_type == SELL_TRANSACTION_TYPE:
+        # Average-cost basis: a sale removes its share of the cost basis.
+        average_cost = cost_basis_cents / quantity if quantity else 0.0
+        return (
+            quantity - transaction_quantity,
+            cost_basis_cents - average_cost * transaction_quantity,
+        )
+    return (
+        quantity + transaction_quantity,
+        cost_basis_cents + transaction_quantity * price_cents,
+    )
+
+
+def replay_holdings(
+    connection: Connection, portfolio_id: int, ticker: str, from_date: datetime.date
+) -> int:
+    """
+    Rebuilds the snapshots of one ticker in a portfolio from `from_date` forward,
+    starting from the last snapshot before it. Appending today's trade only
+    replays today; a backdated trade replays from its date, never from scratch.
+    Also updates the ticker's PortfolioHolding row to the latest snapshot.
+    """
+
+    lock_portfolio_holdings(connection, portfolio_id)
+    connection.execute(
+        delete(_snapshot)
+        .where(_snapshot.c.portfolio_id == portfolio_id)
+        .where(_snapshot.c.ticker == ticker)
+        .where(_snapshot.c.as_of >= from_date)
+    )
+
+    previous = connection.execute(
+        select(_snapshot.c.as_of, _snapshot.c.quantity, _snapshot.c.cost_basis_cents)
+        .where(_snapshot.c.portfolio_id == portfolio_id)
+        .where(_snapshot.c.ticker == ticker)
+        .where(_snapshot.c.as_of < from_date)
+        .order_by(_snapshot.c.as_of.desc())
+        .limit(1)
+    ).first()
+    quantity, cost_basis_cents = previous[1:] if previous else (0.0, 0.0)
+
+    transactions = connection.execute(
+        select(
+            Transaction.transaction_type,
+            Transaction.quantity,
+            Transaction.price_cents,
+            Transaction.purchased_at,
+        )
+        .where(Transaction.portfolio_id == portfolio_id)
+        .where(Transaction.ticker == ticker)
+        .where(
+            Transaction.purchased_at
+            >= datetime.datetime.combine(from_date, datetime.time.min)
+        )
+        .order_by(Transaction.purchased_at.asc(), Transaction.created_at.asc())
+    )
+
+    daily: Dict[datetime.date, Tuple[float, float]] = {}
+    for transaction in transactions:
+        quantity, cost_basis_cents = _apply_transaction(
+            quantity,
+            cost_basis_cents,
+            transaction.transaction_type,
+            transaction.quantity,
+            transaction.price_cents,
+        )
+        daily[transaction.purchased_at.date()] = (quantity, cost_basis_cents)
+
+    if daily:
+        connection.execute(
+            insert(_snapshot),
+            [
+                {
+                    "portfolio_id": portfolio_id,
+                    "ticker": ticker,
+                    "as_of": day,
+                    "quantity": day_quantity,
+                    "cost_basis_cents": day_cost_basis_cents,
+                }
+                for day, (day_quantity, day_cost_basis_cents) in daily.items()
+            ],
+        )
+
+    # The latest snapshot is now the last replayed day or, if nothing is left
+    # from `from_date` on, the one before it.
+    latest = (max(daily), *daily[max(daily)]) if daily else previous
+    connection.execute(
+        delete(_holding)
+        .where(_holding.c.portfolio_id == portfolio_id)
+        .where(_holding.c.ticker == ticker)
+    )
+    if latest and abs(latest[1]) > QUANTITY_TOLERANCE:
+        as_of, quantity, cost_basis_cents = latest
+        connection.execute(
+            insert(_holding).values(
+                portfolio_id=portfolio_id,
+                ticker=ticker,
+                as_of=as_of,
+                quantity=quantity,
+                cost_basis_cents=cost_basis_cents,
+            )
+        )
+    return len(daily)
+
+
+def _affected_holdings(session: Session) -> Dict[Tuple[int, str], datetime.date]:
+    """
+    Maps each (portfolio_id, ticker) touched by the pending flush to the
+    earliest purchase date that changed, including the pre-update values of
+    transactions that were moved between portfolios, tickers or dates.
+    """
+
+    affected: Dict[Tuple[int, str], datetime.date] = {}
+
+    def touch(portfolio_id, ticker, purchased_at) -> None:
+        if portfolio_id is None or ticker is None or purchased_at is None:
+            return
+        key = (portfolio_id, ticker)
+        day = purchased_at.date()
+        affected[key] = min(affected.get(key, day), day)
+
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, Transaction):
+            touch(obj.portfolio_id, obj.ticker, obj.purchased_at)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Transaction) or not session.is_modified(obj):
+            continue
+        touch(obj.portfolio_id, obj.ticker, obj.purchased_at)
+
+        attrs = inspect(obj).attrs
+        previous = [
+            (attrs[key].history.deleted or [getattr(obj, key)])[0]
+            for key in ("portfolio_id", "ticker", "purchased_at")
+        ]
+        touch(*previous)
+
+    return affected
+
+
+def _load_previous_value(target, value, oldvalue, initiator) -> None:
+    pass
+
+
+# Loads the old value when one of these is reassigned on an expired instance,
+# so the holdings it moved away from can be replayed too.
+for _attribute in (
+    Transaction.portfolio_id,
+    Transaction.ticker,
+    Transaction.purchased_at,
+):
+    event.listen(_attribute, "set", _load_previous_value, active_history=True)
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_holding_snapshots(session: Session, _flush_context) -> None:
+    # Runs inside the flushing transaction, so snapshots commit (or roll back)
+    # together with the transaction rows. Bulk Core DML on the transaction table
+    # bypasses the ORM and therefore this hook.
+    affected = _affected_holdings(session)
+    if not affected:
+        return
+
+    connection = session.connection()
+    # Locking in a fixed order keeps flushes touching the same portfolios from
+    # deadlocking each other.
+    for portfolio_id in sorted({portfolio_id for portfolio_id, _ in affected}):
+        lock_portfolio_holdings(connection, portfolio_id)
+    for (portfolio_id, ticker), from_date in affected.items():
+        replay_holdings(connection, portfolio_id, ticker, from_date)
+
+
+async def get_current_holdings(
+    db_session: AsyncSession, portfolio_id: int
+) -> List[PortfolioHolding]:
+    """
+    Returns the open positions of a portfolio, one primary key range read of
+    the rows replay_holdings maintains, whatever the length of its history.
+    """
+
+    holdings = await db_session.scalars(
+        select(PortfolioHolding)
+        .where(PortfolioHolding.portfolio_id == portfolio_id)
+        .order_by(PortfolioHolding.ticker)
+    )
+    return list(holdings)
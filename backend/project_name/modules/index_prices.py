@@ -0,0 +1,152 @@
+import asyncio
+import time
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from collections.abc import Iterable
+from datetime import date
+from datetime import datetime
+from typing import Dict
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from project_name.configs import INDEX_PRICE_CACHE_REFRESH_SECONDS
+from project_name.db.models import IndexPriceHistory
+
+
+class IndexPriceSeries:
+    """
+    Daily open prices for one ticker, held as two parallel arrays sorted by date:
+    dates as proleptic Gregorian ordinals and prices in cents.
+    """
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self._dates = array("l")
+        self._prices = array("q")
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    @property
+    def ordinals(self) -> array:
+        return self._dates
+
+    @property
+    def prices_cents(self) -> array:
+        return self._prices
+
+    @property
+    def last_date(self) -> date | None:
+        return date.fromordinal(self._dates[-1]) if self._dates else None
+
+    def extend(self, rows: Iterable[tuple[date, int]]) -> None:
+        for day, price_cents in sorted(rows):
+            ordinal = day.toordinal()
+            if not self._dates or ordinal > self._dates[-1]:
+                self._dates.append(ordinal)
+                self._prices.append(price_cents)
+                continue
+
+            # Corrections and backfilled gaps are rare; insert in place.
+            index = bisect_left(self._dates, ordinal)
+            if index < len(self._dates) and self._dates[index] == ordinal:
+                self._prices[index] = price_cents
+            else:
+                self._dates.insert(index, ordinal)
+                self._prices.insert(index, price_cents)
+
+    def price_on(self, day: date) -> int | None:
+        ordinal = day.toordinal()
+        index = bisect_left(self._dates, ordinal)
+        if index < len(self._dates) and self._dates[index] == ordinal:
+            return self._prices[index]
+        return None
+
+    def price_on_or_before(self, day: date) -> int | None:
+        """
+        Returns the price of the nearest trading day on or before `day`.
+        """
+
+        index = bisect_right(self._dates, day.toordinal()) - 1
+        return self._prices[index] if index >= 0 else None
+
+
+class IndexPriceCache:
+    """
+    Process-wide cache of index price series. Closed trading days never change,
+    so a series is loaded once and afterwards, every `refresh_seconds`, only
+    fetches rows newer than the latest date it holds.
+    """
+
+    def __init__(self, refresh_seconds: float = INDEX_PRICE_CACHE_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._series: Dict[str, IndexPriceSeries] = {}
+        self._refreshed_at: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    def clear(self) -> None:
+        self._series.clear()
+        self._refreshed_at.clear()
+
+    def set_series(self, series: IndexPriceSeries) -> None:
+        """
+        Installs a series as freshly refreshed, e.g. to seed the cache without a
+        database.
+        """
+
+        self._series[series.ticker] = series
+        self._refreshed_at[series.ticker] = time.monotonic()
+
+    def _is_stale(self, ticker: str) -> bool:
+        refreshed_at = self._refreshed_at.get(ticker)
+        return (
+            refreshed_at is None
+            or time.monotonic() - refreshed_at > self.refresh_seconds
+        )
+
+    async def _refresh(self, db_session: AsyncSession, ticker: str) -> int:
+        series = self._series.get(ticker) or IndexPriceSeries(ticker)
+        query = select(IndexPriceHistory.date, IndexPriceHistory.open_price_cents)
+        query = query.where(IndexPriceHistory.ticker == ticker)
+        if series.last_date is not None:
+            query = query.where(IndexPriceHistory.date > series.last_date)
+
+        rows = (await db_session.execute(query)).all()
+        series.extend((row.date.date(), row.open_price_cents) for row in rows)
+        self._series[ticker] = series
+        self._refreshed_at[ticker] = time.monotonic()
+        return len(rows)
+
+    async def refresh(self, db_session: AsyncSession, ticker: str) -> int:
+        async with self._lock:
+            return await self._refresh(db_session, ticker)
+
+    async def get_series(
+        self, db_session: AsyncSession, ticker: str
+    ) -> IndexPriceSeries:
+        if self._is_stale(ticker):
+            async with self._lock:
+                # Requests that queued on the lock find it refreshed by the
+                # first one and skip the query.
+                if self._is_stale(ticker):
+                    await self._refresh(db_session, ticker)
+        return self._series[ticker]
+
+    async def prices_for_dates(
+        self, db_session: AsyncSession, ticker: str, dates: List[date]
+    ) -> Dict[date, int]:
+        series = await self.get_series(db_session, ticker)
+        prices = {}
+        for day in dates:
+            if isinstance(day, datetime):
+                day = day.date()
+            price = series.price_on(day)
+            if price is not None:
+                prices[day] = price
+        return prices
+
+
+index_price_cache = IndexPriceCache()
@@ -0,0 +1,53 @@
+import hmac
+from typing import Annotated
+
+from fastapi import APIRouter
+from fastapi import Depends
+from fastapi import Header
+from fastapi import HTTPException
+from fastapi import Response
+from fastapi import status
+from prometheus_client import CollectorRegistry
+from prometheus_client import CONTENT_TYPE_LATEST
+from prometheus_client import generate_latest
+from prometheus_client import multiprocess
+from prometheus_client import REGISTRY
+
+from project_name.configs import METRICS_TOKEN
+from project_name.configs import PROMETHEUS_MULTIPROC_DIR
+
+router = APIRouter(prefix="/metrics")
+
+"""
+Prometheus scrape endpoint.
+"""
+
+
+def require_metrics_token(
+    authorization: Annotated[str | None, Header()] = None,
+) -> None:
+    if METRICS_TOKEN is None:
+        return
+    if authorization is None or not hmac.compare_digest(
+        authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get("", dependencies=[Depends(require_metrics_token)])
+def metrics():
+    """
+    Current values of every registered metric, in the Prometheus text format.
+    Under gunicorn the values of all workers are aggregated, whichever worker
+    serves the scrape.
+    """
+
+    registry = REGISTRY
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
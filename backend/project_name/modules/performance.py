@@ -0,0 +1,189 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict
+from typing import List
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from project_name.db.models import Transaction
+from project_name.modules.holdings import SELL_TRANSACTION_TYPE
+from project_name.modules.index_prices import IndexPriceSeries
+
+
+@dataclass
+class TransactionColumns:
+    """
+    Transactions of one or more portfolios as columnar arrays, sorted by
+    (portfolio_id, purchased_at, created_at). Tickers are dictionary-encoded:
+    `ticker_codes[i]` indexes into `tickers`.
+    """
+
+    portfolio_ids: np.ndarray
+    ticker_codes: np.ndarray
+    tickers: np.ndarray
+    quantity: np.ndarray
+    price_cents: np.ndarray
+    purchased_at: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.portfolio_ids)
+
+    @staticmethod
+    def from_rows(
+        portfolio_ids: List[int],
+        tickers: List[str],
+        quantities: List[float],
+        price_cents: List[int],
+        is_sell: List[bool],
+        purchased_at: List[date],
+    ) -> "TransactionColumns":
+        unique_tickers, ticker_codes = np.unique(
+            np.asarray(tickers, dtype=object), return_inverse=True
+        )
+        quantity = np.asarray(quantities, dtype=np.float64)
+        return TransactionColumns(
+            portfolio_ids=np.asarray(portfolio_ids, dtype=np.int64),
+            ticker_codes=ticker_codes.astype(np.int32),
+            tickers=unique_tickers,
+            # Sells are stored as negative quantities so positions are plain sums.
+            quantity=np.where(np.asarray(is_sell, dtype=bool), -quantity, quantity),
+            price_cents=np.asarray(price_cents, dtype=np.int64),
+            purchased_at=np.fromiter(
+                (day.toordinal() for day in purchased_at),
+                dtype=np.int64,
+                count=len(purchased_at),
+            ),
+        )
+
+
+@dataclass
+class PerformanceResult:
+    """
+    Per-transaction running totals, aligned with the input columns, plus the
+    final values for each portfolio. `net_invested_cents` is cash paid for buys
+    less cash received from sells; it is not the average-cost basis of the
+    remaining holdings (see `holdings.py`).
+    """
+
+    net_invested_cents: np.ndarray
+    position: np.ndarray
+    spy_shares: np.ndarray
+    portfolio_net_invested_cents: Dict[int, float]
+    portfolio_spy_shares: Dict[int, float]
+
+
+async def load_transaction_columns(
+    db_session: AsyncSession, portfolio_ids: List[int]
+) -> TransactionColumns:
+    rows = await db_session.execute(
+        select(
+            Transaction.portfolio_id,
+            Transaction.ticker,
+            Transaction.quantity,
+            Transaction.price_cents,
+            Transaction.transaction_type,
+            Transaction.purchased_at,
+        )
+        .where(Transaction.portfolio_id.in_(portfolio_ids))
+        .order_by(
+            Transaction.portfolio_id,
+            Transaction.purchased_at.asc(),
+            Transaction.created_at.asc(),
+        )
+    )
+    columns = list(zip(*rows)) or [[]] * 6
+    portfolio_id, ticker, quantity, price_cents, transaction_type, purchased_at = (
+        columns
+    )
+    return TransactionColumns.from_rows(
+        portfolio_ids=portfolio_id,
+        tickers=ticker,
+        quantities=quantity,
+        price_cents=price_cents,
+        is_sell=[kind == SELL_TRANSACTION_TYPE for kind in transaction_type],
+        purchased_at=[value.date() for value in purchased_at],
+    )
+
+
+def _group_starts(keys: np.ndarray) -> np.ndarray:
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+
+
+def _grouped_cumsum(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Running sum of `values` that restarts at every index in `starts`.
+    """
+
+    totals = np.cumsum(values)
+    if not len(totals):
+        return totals
+    offsets = np.concatenate(([0], totals[starts[1:] - 1]))
+    lengths = np.diff(np.append(starts, len(values)))
+    return totals - np.repeat(offsets, lengths)
+
+
+def spy_prices_on_or_before(spy: IndexPriceSeries, ordinals: np.ndarray) -> np.ndarray:
+    """
+    Vectorized nearest-prior-trading-day lookup; NaN where no earlier price exists.
+    """
+
+    if not len(spy.ordinals):
+        return np.full(len(ordinals), np.nan)
+    spy_ordinals = np.frombuffer(spy.ordinals, dtype=f"i{spy.ordinals.itemsize}")
+    spy_prices = np.frombuffer(spy.prices_cents, dtype=f"i{spy.prices_cents.itemsize}")
+    indexes = np.searchsorted(spy_ordinals, ordinals, side="right") - 1
+    prices = spy_prices[np.clip(indexes, 0, None)].astype(np.float64)
+    prices[indexes < 0] = np.nan
+    return prices
+
+
+def compute_performance(
+    columns: TransactionColumns, spy: IndexPriceSeries
+) -> PerformanceResult:
+    """
+    Computes running net invested cash and SPY-equivalent holdings per portfolio, and
+    running positions per (portfolio, ticker), for every portfolio in `columns`
+    at once.
+    """
+
+    cash_flow_cents = columns.quantity * columns.price_cents
+    portfolio_starts = _group_starts(columns.portfolio_ids)
+
+    net_invested_cents = _grouped_cumsum(cash_flow_cents, portfolio_starts)
+
+    # Buying SPY with the same cash on the same day gives the benchmark holding.
+    spy_shares = _grouped_cumsum(
+        np.nan_to_num(
+            cash_flow_cents / spy_prices_on_or_before(spy, columns.purchased_at)
+        ),
+        portfolio_starts,
+    )
+
+    # A stable sort by (portfolio, ticker) keeps purchase order within each group.
+    order = np.lexsort((columns.ticker_codes, columns.portfolio_ids))
+    position_keys = columns.portfolio_ids[order] * (len(columns.tickers) + 1)
+    position_keys += columns.ticker_codes[order]
+    position = np.empty_like(columns.quantity)
+    position[order] = _grouped_cumsum(
+        columns.quantity[order], _group_starts(position_keys)
+    )
+
+    portfolio_ends = portfolio_starts[1:] - 1
+    if len(columns):
+        portfolio_ends = np.append(portfolio_ends, len(columns) - 1)
+    portfolio_ids = columns.portfolio_ids[portfolio_ends].tolist()
+    return PerformanceResult(
+        net_invested_cents=net_invested_cents,
+        position=position,
+        spy_shares=spy_shares,
+        portfolio_net_invested_cents=dict(
+            zip(portfolio_ids, net_invested_cents[portfolio_ends].tolist())
+        ),
+        portfolio_spy_shares=dict(
+            zip(portfolio_ids, spy_shares[portfolio_ends].tolist())
+        ),
+    )
@@ -0,0 +1,77 @@
+"""
+Queries for the User aggregate with explicit loader strategies. Every relation
+is loaded up front in a fixed number of round trips, whatever the number of
+portfolios or transactions, and anything not listed raises instead of
+lazy-loading one query at a time.
+"""
+
+from typing import List
+
+from sqlalchemy import func
+from sqlalchemy import Select
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import raiseload
+from sqlalchemy.orm import selectinload
+
+from project_name.db.models import Portfolio
+from project_name.db.models import Transaction
+from project_name.db.models import User
+
+
+def select_user_with_preferences(user_id: int) -> Select:
+    """
+    One round trip: preferences are one-to-one, so they are joined in.
+    """
+
+    return (
+        select(User)
+        .where(User.id == user_id)
+        .options(joinedload(User.preferences), raiseload("*"))
+    )
+
+
+def select_user_aggregate(user_id: int) -> Select:
+    """
+    Three round trips: the user joined with its preferences, then one
+    `IN (...)` query each for the portfolios and transactions collections.
+    """
+
+    return (
+        select(User)
+        .where(User.id == user_id)
+        .options(
+            joinedload(User.preferences),
+            selectinload(User.portfolios),
+            selectinload(User.transactions),
+            raiseload("*"),
+        )
+    )
+
+
+async def get_user_aggregate(db_session: AsyncSession, user_id: int) -> User | None:
+    return await db_session.scalar(select_user_aggregate(user_id))
+
+
+async def list_portfolio_summaries(db_session: AsyncSession, user_id: int) -> List[Row]:
+    """
+    Portfolio columns plus a transaction count for each of a user's portfolios,
+    in one round trip and without building ORM objects.
+    """
+
+    result = await db_session.execute(
+        select(
+            Portfolio.id,
+            Portfolio.name,
+            Portfolio.description,
+            Portfolio.created_at,
+            func.count(Transaction.id).label("transaction_count"),
+        )
+        .outerjoin(Transaction, Transaction.portfolio_id == Portfolio.id)
+        .where(Portfolio.user_id == user_id)
+        .group_by(Portfolio.id)
+        .order_by(Portfolio.id)
+    )
+    return list(result)
@@ -1,25 +1,40 @@
+import json
+from collections.abc import AsyncIterator
 from datetime import timedelta
 
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import HTTPException
+from fastapi import Query
 from fastapi import Response
 from fastapi import status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import Select
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from project_name.configs import ACCESS_TOKEN_EXPIRE_MINUTES
-from project_name.db.engine import get_sqlalchemy_engine
+from project_name.db.engine import get_async_session_factory
+from project_name.db.engine import get_session
 from project_name.db.models import User
 from project_name.modules.auth.models import DisplayUser
+from project_name.modules.auth.models import DisplayUserList
 from project_name.modules.user.models import UpdateUserRequest
 from project_name.utils.auth import create_access_token
 from project_name.utils.auth import get_current_admin_user
 from project_name.utils.auth import get_current_user
-from project_name.utils.auth import get_password_hash
+from project_name.utils.auth import invalidate_cached_user
+from project_name.utils.hashing import password_hasher
+from project_name.utils.query_budget import query_budget
+from project_name.utils.responses import ModelResponse
+from project_name.utils.revocation import token_revocations
 
 router = APIRouter(prefix="/user")
 
+USER_PAGE_CHUNK_SIZE = 500
+
 """
 Handle user management.
 """
@@ -28,61 +43,70 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 @router.get("/me")
+@query_budget(1)
 async def read_users_me(
     current_user: User = Depends(get_current_user),
 ):
-    return DisplayUser.from_db(current_user)
+    return ModelResponse(DisplayUser.from_db(current_user))
 
 
 @router.post("/update")
+@query_budget(3)
 async def update_user(
     update_user_request: UpdateUserRequest,
-    response: Response,
     current_user: User = Depends(get_current_user),
+    db_session: AsyncSession = Depends(get_session),
 ):
 
-    if update_user_request.old_password and not current_user.check_password(
-        update_user_request.old_password
+    if update_user_request.old_password and not await password_hasher.verify(
+        update_user_request.old_password, current_user.hashed_password
     ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Old password is incorrect",
         )
 
-    with Session(get_sqlalchemy_engine()) as db_session:
-        current_user.email = update_user_request.email or current_user.email
-        current_user.username = update_user_request.username or current_user.username
+    old_username = current_user.username
+    current_user.email = update_user_request.email or current_user.email
+    current_user.username = update_user_request.username or current_user.username
 
-        if update_user_request.new_password:
-            current_user.hashed_password = get_password_hash(
-                update_user_request.new_password or update_user_request.old_password
-            )
+    if update_user_request.new_password:
+        current_user.hashed_password = await password_hasher.hash(
+            update_user_request.new_password or update_user_request.old_password
+        )
+        # Sign out every other session; the token issued below stays valid.
+        await token_revocations.revoke_user_tokens(db_session, current_user.id)
 
-        db_session.add(current_user)
-        db_session.commit()
+    await db_session.commit()
+    invalidate_cached_user(old_username, current_user.username)
 
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": current_user.username}, expires_delta=access_token_expires
-        )
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": current_user.username, "uid": current_user.id},
+        expires_delta=access_token_expires,
+    )
 
-        response.set_cookie(
-            key="access_token",
-            value=access_token,
-            httponly=True,
-            max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-        )
+    response = ModelResponse(DisplayUser.from_db(current_user))
+    response.set_cookie(
+        key="access_token",
+        value=access_token,
+        httponly=True,
+        max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    )
 
-        return DisplayUser.from_db(current_user)
+    return response
 
 
 @router.post("/delete")
 async def delete_user(
-    response: Response, current_user: User = Depends(get_current_user)
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db_session: AsyncSession = Depends(get_session),
 ):
-    with Session(get_sqlalchemy_engine()) as db_session:
-        db_session.delete(current_user)
-        db_session.commit()
+    await db_session.delete(current_user)
+    await token_revocations.revoke_user_tokens(db_session, current_user.id)
+    await db_session.commit()
+    invalidate_cached_user(current_user.username)
 
     response.delete_cookie(key="access_token")
     return {"message": "User deleted"}
@@ -94,79 +118,153 @@ Admin endpoints
 
 
 @router.post("/promote/{username}")
+@query_budget(3)
 async def promote_user(
     username: str,
     _: User = Depends(get_current_admin_user),
+    db_session: AsyncSession = Depends(get_session),
 ):
+    current_user = await db_session.scalar(
+        select(User).where(User.username == username)
+    )
 
-    with Session(get_sqlalchemy_engine()) as db_session:
-
-        current_user = db_session.query(User).filter(User.username == username).first()
-
-        if not current_user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found",
-            )
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
 
-        current_user.is_admin = True
-        current_user.save()
+    current_user.is_admin = True
+    await db_session.commit()
+    invalidate_cached_user(username)
 
-        return DisplayUser.from_db(current_user)
+    return ModelResponse(DisplayUser.from_db(current_user))
 
 
 @router.post("/demote/{username}")
+@query_budget(3)
 async def demote_user(
     username: str,
     _: User = Depends(get_current_admin_user),
+    db_session: AsyncSession = Depends(get_session),
 ):
+    current_user = await db_session.scalar(
+        select(User).where(User.username == username)
+    )
 
-    with Session(get_sqlalchemy_engine()) as db_session:
-        current_user = db_session.query(User).filter(User.username == username).first()
-
-        if not current_user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found",
-            )
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
 
-        current_user.is_admin = False
-        current_user.save()
+    current_user.is_admin = False
+    await db_session.commit()
+    invalidate_cached_user(username)
 
-        return DisplayUser.from_db(current_user)
+    return ModelResponse(DisplayUser.from_db(current_user))
 
 
 @router.get("/list")
+@query_budget(3)
 async def list_users(
+    after_id: int | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    username_prefix: str | None = None,
+    email_prefix: str | None = None,
     _: User = Depends(get_current_admin_user),
+    db_session: AsyncSession = Depends(get_session),
 ):
-    with Session(get_sqlalchemy_engine()) as db_session:
-        users = db_session.query(User).all()
-        return [DisplayUser.from_db(user) for user in users]
+    """
+    Lists users a page at a time, ordered by id. Pass the returned `next_cursor`
+    as `after_id` to fetch the next page; it is null on the last page.
+    """
+
+    query = select(
+        User.id, User.username, User.email, User.created_at, User.is_admin
+    ).order_by(User.id)
+
+    if after_id is not None:
+        query = query.where(User.id > after_id)
+    if username_prefix:
+        query = query.where(User.username.startswith(username_prefix, autoescape=True))
+    if email_prefix:
+        query = query.where(User.email.startswith(email_prefix, autoescape=True))
+
+    # reltuples is maintained by (auto)vacuum/analyze; -1 means never analyzed.
+    estimated_total = await db_session.scalar(
+        text(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass('\"user\"')"
+        )
+    )
+
+    return StreamingResponse(
+        _stream_user_page(query.limit(limit), limit, max(estimated_total or 0, 0)),
+        media_type="application/json",
+    )
+
+
+async def _stream_user_page(
+    query: Select, limit: int, estimated_total: int
+) -> AsyncIterator[str | bytes]:
+    # Dependencies exit before the body is sent, so the stream needs its own session.
+    last_id = None
+    count = 0
+
+    yield '{"users":['
+    async with get_async_session_factory()() as db_session:
+        rows = await db_session.stream(query)
+        async for partition in rows.partitions(USER_PAGE_CHUNK_SIZE):
+            if count:
+                yield ","
+            # One dump per chunk, without the surrounding brackets. Rows unpack in
+            # the column order selected by list_users.
+            yield DisplayUserList.dump_json(
+                [
+                    {
+                        "username": username,
+                        "email": email,
+                        "created_at": created_at,
+                        "is_admin": is_admin,
+                    }
+                    for _, username, email, created_at, is_admin in partition
+                ]
+            )[1:-1]
+            last_id = partition[-1].id
+            count += len(partition)
+
+    next_cursor = last_id if count == limit else None
+    yield (
+        f'],"next_cursor":{json.dumps(next_cursor)},'
+        f'"estimated_total":{estimated_total}}}'
+    )
 
 
 @router.delete("/delete/{username}")
 async def delete_user(
     username: str,
     _: User = Depends(get_current_admin_user),
+    db_session: AsyncSession = Depends(get_session),
 ):
+    current_user = await db_session.scalar(
+        select(User).where(User.username == username)
+    )
 
-    with Session(get_sqlalchemy_engine()) as db_session:
-        current_user = db_session.query(User).filter(User.username == username).first()
-
-        if not current_user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found",
-            )
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
 
-        if current_user.is_admin:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Cannot delete admin user",
-            )
+    if current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot delete admin user",
+        )
 
-        db_session.delete(current_user)
-        db_session.commit()
+    await db_session.delete(current_user)
+    await token_revocations.revoke_user_tokens(db_session, current_user.id)
+    await db_session.commit()
+    invalidate_cached_user(username)
 
-        return DisplayUser.from_db(current_user)
+    return ModelResponse(DisplayUser.from_db(current_user))
@@ -0,0 +1,22 @@
+import argparse
+
+from project_name.configs import INDEX_PRICE_TICKERS
+from project_name.jobs.backfill_index_prices import backfill_index_prices
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Load daily index prices newer than the latest stored date."
+    )
+    parser.add_argument(
+        "--csv",
+        help="Load from a local CSV file instead of the remote price source.",
+    )
+    parser.add_argument("--tickers", nargs="+", default=INDEX_PRICE_TICKERS)
+    args = parser.parse_args()
+
+    backfill_index_prices(args.tickers, args.csv)
+
+
+if __name__ == "__main__":
+    main()
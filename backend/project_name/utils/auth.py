@@ -1,3 +1,6 @@
+import hashlib
+import time
+import uuid
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
@@ -8,41 +11,72 @@ from fastapi import Depends
 from fastapi import HTTPException
 from fastapi import status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
-from jose import JWTError
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from project_name.configs import HASH_ALGORITHM
 from project_name.configs import HASH_SECRET_KEY
-from project_name.db.engine import get_sqlalchemy_engine
+from project_name.configs import JWT_DECODE_CACHE_SIZE
+from project_name.configs import JWT_DECODE_CACHE_TTL_SECONDS
+from project_name.configs import USER_CACHE_SIZE
+from project_name.configs import USER_CACHE_TTL_SECONDS
+from project_name.db.engine import get_session
 from project_name.db.models import User
+from project_name.utils.cache import TTLCache
+from project_name.utils.hashing import password_hasher
+from project_name.utils.revocation import token_revocations
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Detached snapshots of authenticated users, keyed by username.
+user_cache: TTLCache[str, User] = TTLCache(
+    USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS, "user"
+)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Claims of already-verified tokens, keyed by a digest of the signing key and token.
+jwt_decode_cache: TTLCache[bytes, dict] = TTLCache(
+    JWT_DECODE_CACHE_SIZE, JWT_DECODE_CACHE_TTL_SECONDS, "jwt_decode"
+)
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def _detached_copy(user: User) -> User:
+    user_copy = User(
+        **{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    )
+    make_transient_to_detached(user_copy)
+    return user_copy
+
 
+def invalidate_cached_user(*usernames: str | None) -> None:
+    for username in usernames:
+        if username is not None:
+            user_cache.invalidate(username)
 
-def get_user(username: str) -> User | None:
-    with Session(get_sqlalchemy_engine()) as db_session:
-        return db_session.query(User).filter(User.username == username).first()
 
+async def get_user(username: str, db_session: AsyncSession) -> User | None:
+    return await db_session.scalar(select(User).where(User.username == username))
 
-def authenticate_user(username: str, password: str) -> User | None:
-    user = get_user(username)
-    if user and verify_password(password, user.hashed_password):
+
+async def authenticate_user(
+    username: str, password: str, db_session: AsyncSession
+) -> User | None:
+    user = await get_user(username, db_session)
+    if user and await password_hasher.verify(password, user.hashed_password):
         return user
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
+    """
+    `data` must include the user's username as `sub` and id as `uid`; `iat`
+    and `jti` are added for revocation.
+    """
+
+    from jose import jwt
+
     to_encode = data.copy()
+    to_encode.update({"iat": time.time(), "jti": uuid.uuid4().hex})
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
@@ -52,8 +86,40 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
+def _token_cache_key(access_token: str) -> bytes:
+    # Keying on the signing key as well means a rotated HASH_SECRET_KEY can never
+    # be answered with claims verified under the previous key.
+    digest = hashlib.sha256(HASH_SECRET_KEY.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(access_token.encode("utf-8"))
+    return digest.digest()
+
+
+def decode_access_token(access_token: str) -> dict:
+    # jose (and the crypto backends it probes) is imported on first use rather
+    # than at startup; after that the import is a dict lookup.
+    from jose import jwt
+
+    if not jwt_decode_cache.enabled:
+        return jwt.decode(access_token, HASH_SECRET_KEY, algorithms=[HASH_ALGORITHM])
+
+    cache_key = _token_cache_key(access_token)
+    payload = jwt_decode_cache.get(cache_key)
+    if payload is None:
+        payload = jwt.decode(access_token, HASH_SECRET_KEY, algorithms=[HASH_ALGORITHM])
+        # Never serve a token from the cache past its own expiry.
+        seconds_until_expiry = payload.get("exp", 0) - time.time()
+        jwt_decode_cache.set(
+            cache_key,
+            payload,
+            ttl_seconds=min(seconds_until_expiry, JWT_DECODE_CACHE_TTL_SECONDS),
+        )
+    return payload
+
+
 async def get_current_user(
     access_token: Annotated[str, Cookie()] = None,
+    db_session: AsyncSession = Depends(get_session),
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,18 +130,26 @@ async def get_current_user(
     if access_token is None:
         raise credentials_exception
 
+    from jose import JWTError
+
     try:
-        payload = jwt.decode(access_token, HASH_SECRET_KEY, algorithms=[HASH_ALGORITHM])
+        payload = decode_access_token(access_token)
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or token_revocations.is_revoked(payload):
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = get_user(username=username)
+    cached_user = user_cache.get(username)
+    if cached_user is not None:
+        # Attach a per-request copy of the snapshot without querying the database.
+        return await db_session.merge(cached_user, load=False)
+
+    user = await get_user(username, db_session)
     if user is None:
         raise credentials_exception
 
+    user_cache.set(username, _detached_copy(user))
     return user
 
 
@@ -0,0 +1,107 @@
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import Generic
+from typing import TypeVar
+
+from prometheus_client import Counter
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+CACHE_HITS = Counter("cache_hits_total", "Lookups served from the cache.", ["cache"])
+CACHE_MISSES = Counter(
+    "cache_misses_total", "Lookups not served, including expired entries.", ["cache"]
+)
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total", "Entries dropped to stay within maxsize.", ["cache"]
+)
+CACHE_EXPIRATIONS = Counter(
+    "cache_expirations_total", "Entries found expired on lookup.", ["cache"]
+)
+CACHE_INVALIDATIONS = Counter(
+    "cache_invalidations_total", "Entries removed by invalidate().", ["cache"]
+)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Bounded LRU cache whose entries also expire after a time-to-live.
+
+    Not thread-safe; it is meant to be used from the event loop thread. Its
+    stats are also exported as Prometheus counters labelled with `name`.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float, name: str):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self.stats = CacheStats()
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        # Resolving the labelled children once keeps lookups off the label dict.
+        self._hits = CACHE_HITS.labels(name)
+        self._misses = CACHE_MISSES.labels(name)
+        self._evictions = CACHE_EVICTIONS.labels(name)
+        self._expirations = CACHE_EXPIRATIONS.labels(name)
+        self._invalidations = CACHE_INVALIDATIONS.labels(name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl_seconds > 0
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            self._misses.inc()
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            self._expirations.inc()
+            self._misses.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        self._hits.inc()
+        return value
+
+    def set(self, key: K, value: V, ttl_seconds: float | None = None) -> None:
+        if not self.enabled:
+            return
+
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl_seconds <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+            self._evictions.inc()
+
+    def invalidate(self, key: K) -> None:
+        if self._entries.pop(key, None) is not None:
+            self.stats.invalidations += 1
+            self._invalidations.inc()
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -1,20 +1,27 @@
-import smtplib
 from email.mime.application import MIMEApplication
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from typing import List
 
+from project_name.configs import SMTP_HOST
+from project_name.configs import SMTP_KEEPALIVE_SECONDS
+from project_name.configs import SMTP_POOL_SIZE
+from project_name.configs import SMTP_PORT
+from project_name.configs import SMTP_USE_SSL
 from project_name.configs import SUPPORT_EMAIL
 from project_name.configs import SUPPORT_EMAIL_APP_PASSWORD
 from project_name.configs import WEB_URL
+from project_name.utils.smtp_pool import SMTPConnectionPool
 
-
-def _send_email(email_to: str, msg: MIMEMultipart):
-    smtpserver = smtplib.SMTP_SSL("smtp.gmail.com", 465)
-    smtpserver.ehlo()
-    smtpserver.login(SUPPORT_EMAIL, SUPPORT_EMAIL_APP_PASSWORD)
-    smtpserver.sendmail(SUPPORT_EMAIL, email_to, msg.as_string())
-    smtpserver.close()
+smtp_pool = SMTPConnectionPool(
+    host=SMTP_HOST,
+    port=SMTP_PORT,
+    sender=SUPPORT_EMAIL,
+    password=SUPPORT_EMAIL_APP_PASSWORD,
+    use_ssl=SMTP_USE_SSL,
+    max_connections=SMTP_POOL_SIZE,
+    keepalive_seconds=SMTP_KEEPALIVE_SECONDS,
+)
 
 
 def _create_email_message(email_to: str, subject: str, body: str):
@@ -46,20 +53,21 @@ def _create_email_message_with_attachments(
     return msg
 
 
-def send_data_request_email(email_to: str, attachment: bytes):
+def create_data_request_email(
+    email_to: str, attachment: bytes, attachment_name: str = "data.json"
+) -> MIMEMultipart:
     subject = "Your Data Request"
     body = (
         "Thank you for your data request. We have processed "
         "your request and attached the data file to this email."
         "\n\nBest,\nproject_title Team"
     )
-    msg = _create_email_message_with_attachments(
-        email_to, subject, body, [attachment], ["data.json"]
+    return _create_email_message_with_attachments(
+        email_to, subject, body, [attachment], [attachment_name]
     )
-    _send_email(email_to, msg)
 
 
-def send_reset_password_email(email_to: str, request_uuid: str):
+def create_reset_password_email(email_to: str, request_uuid: str) -> MIMEMultipart:
     reset_password_link = f"{WEB_URL}/auth/reset-password/{request_uuid}"
 
     subject = "Reset Your Password"
@@ -68,5 +76,4 @@ def send_reset_password_email(email_to: str, request_uuid: str):
         "\nIf you did not request a password reset, please ignore this email."
         f"\n\n{reset_password_link}\n\nBest,\nproject_title Team"
     )
-    msg = _create_email_message(email_to, subject, body)
-    _send_email(email_to, msg)
+    return _create_email_message(email_to, subject, body)
@@ -0,0 +1,179 @@
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi import status
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+
+from project_name.configs import PASSWORD_HASH_MAX_QUEUE
+from project_name.configs import PASSWORD_HASH_POOL
+from project_name.configs import PASSWORD_HASH_REJECT_WHEN_SATURATED
+from project_name.configs import PASSWORD_HASH_WORKERS
+
+_PWD_CONTEXT = None
+
+PASSWORD_HASH_WAIT_SECONDS = Histogram(
+    "password_hash_wait_seconds",
+    "Time hashes and verifications spent queued for a worker.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+PASSWORD_HASH_RUN_SECONDS = Histogram(
+    "password_hash_run_seconds",
+    "Time hashes and verifications took once running.",
+    buckets=(0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.75, 1.0, 2.0),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Hashes and verifications refused with a 503 because the queue was full.",
+)
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "Hashes and verifications submitted and not yet finished.",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Hashes and verifications waiting for a free worker.",
+    multiprocess_mode="livesum",
+)
+
+
+def get_pwd_context():
+    # passlib is only needed once a password is checked, and in process pools
+    # only inside the workers, so it is kept out of the import path.
+    global _PWD_CONTEXT
+    if _PWD_CONTEXT is None:
+        from passlib.context import CryptContext
+
+        _PWD_CONTEXT = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _PWD_CONTEXT
+
+
+def verify_password(plain_password, hashed_password):
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def get_password_hash(password):
+    return get_pwd_context().hash(password)
+
+
+def _timed_call(fn: Callable, *args: Any) -> tuple[Any, float]:
+    # Runs inside the worker, so it must stay a picklable module-level function.
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+@dataclass
+class HashingStats:
+    submitted: int = 0
+    completed: int = 0
+    rejected: int = 0
+    pending: int = 0
+    max_queue_depth: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    total_run_seconds: float = 0.0
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a bounded worker pool so that the
+    event loop is never blocked by a ~250 ms hash.
+    """
+
+    def __init__(
+        self,
+        pool: str = "thread",
+        workers: int = 4,
+        max_queue: int = 64,
+        reject_when_saturated: bool = True,
+    ):
+        if pool not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash pool type: {pool}")
+
+        self.pool = pool
+        self.workers = workers
+        self.max_queue = max_queue
+        self.reject_when_saturated = reject_when_saturated
+        self.stats = HashingStats()
+        self._executor: Executor | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.stats.pending - self.workers, 0)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.pool == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def _run(self, fn: Callable, *args: Any) -> Any:
+        if self.reject_when_saturated and self.queue_depth >= self.max_queue:
+            self.stats.rejected += 1
+            PASSWORD_HASH_REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self.stats.submitted += 1
+        self.stats.pending += 1
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.queue_depth)
+        self._report_pending()
+        submitted_at = time.perf_counter()
+
+        try:
+            loop = asyncio.get_running_loop()
+            result, run_seconds = await loop.run_in_executor(
+                self._get_executor(), _timed_call, fn, *args
+            )
+        finally:
+            self.stats.pending -= 1
+            self._report_pending()
+
+        wait_seconds = max(time.perf_counter() - submitted_at - run_seconds, 0.0)
+        self.stats.completed += 1
+        self.stats.total_run_seconds += run_seconds
+        self.stats.total_wait_seconds += wait_seconds
+        self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, wait_seconds)
+        PASSWORD_HASH_RUN_SECONDS.observe(run_seconds)
+        PASSWORD_HASH_WAIT_SECONDS.observe(wait_seconds)
+        return result
+
+    def _report_pending(self) -> None:
+        PASSWORD_HASH_PENDING.set(self.stats.pending)
+        PASSWORD_HASH_QUEUE_DEPTH.set(self.queue_depth)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    pool=PASSWORD_HASH_POOL,
+    workers=PASSWORD_HASH_WORKERS,
+    max_queue=PASSWORD_HASH_MAX_QUEUE,
+    reject_when_saturated=PASSWORD_HASH_REJECT_WHEN_SATURATED,
+)
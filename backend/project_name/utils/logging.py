@@ -1,13 +1,218 @@
+"""
+Logging that never blocks the caller on I/O.
+
+Handlers on the `project_name` logger only filter a record and put it on a
+bounded queue; a `QueueListener` thread formats it as one JSON object per line
+and writes it to stderr. Records are formatted on that thread, so log with
+%-style arguments rather than f-strings and don't mutate the arguments after
+logging them. When the queue is full, or a record is sampled out or is a
+repeat of a recent error, it is dropped and counted in
+log_records_dropped_total.
+"""
+
+import atexit
+import datetime
+import json
 import logging
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+from typing import Dict
+from typing import Tuple
+
+from prometheus_client import Counter
+
+from project_name.configs import LOG_LEVEL
+from project_name.configs import LOG_QUEUE_SIZE
+from project_name.configs import LOG_REPEAT_LIMIT
+from project_name.configs import LOG_REPEAT_PERIOD_SECONDS
+from project_name.configs import LOG_SAMPLE_RATES
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped before being written.",
+    ["reason"],
+)
+
+# Attributes every LogRecord has; anything else was passed through `extra`.
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime", "suppressed"}
+
+
+def parse_sample_rates(sample_rates: str) -> Dict[str, float]:
+    rates = {}
+    for pair in filter(None, sample_rates.split(",")):
+        name, rate = pair.split("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a configured fraction of the records below ERROR from a logger and
+    its children. The most specific configured logger name wins.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._rate_by_logger: Dict[str, float] = {}
+
+    def _get_rate(self, name: str) -> float:
+        rate = self._rate_by_logger.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._rate_by_logger[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        rate = self._get_rate(record.name)
+        if rate >= 1 or random.random() < rate:
+            return True
+        LOG_RECORDS_DROPPED.labels("sampled").inc()
+        return False
+
+
+class RepeatedErrorFilter(logging.Filter):
+    """
+    Lets through at most `limit` errors per `period_seconds` from each logging
+    call site and exception type. The first record let through after some
+    were suppressed carries their number as `suppressed`.
+    """
+
+    def __init__(self, limit: int, period_seconds: float, max_keys: int = 10000):
+        super().__init__()
+        self.limit = limit
+        self.period_seconds = period_seconds
+        self.max_keys = max_keys
+        # key -> [window start, records let through, records suppressed]
+        self._windows: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.ERROR and not record.exc_info:
+            return True
+
+        exc_type = record.exc_info[0] if record.exc_info else None
+        key = (record.name, record.pathname, record.lineno, exc_type)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period_seconds:
+                if window is None and len(self._windows) >= self.max_keys:
+                    self._windows = {
+                        key: window
+                        for key, window in self._windows.items()
+                        if now - window[0] < self.period_seconds
+                    }
+                suppressed = window[2] if window is not None else 0
+                window = self._windows[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            if window[1] >= self.limit:
+                window[2] += 1
+                LOG_RECORDS_DROPPED.labels("rate_limited").inc()
+                return False
+            window[1] += 1
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The default formats the message and traceback here, on the caller's
+        # thread; leave that to the listener.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels("queue_full").inc()
+
+
+_queue_handler: NonBlockingQueueHandler | None = None
+_stream_handler: logging.StreamHandler | None = None
+_listener: QueueListener | None = None
+
+
+def _start_listener() -> None:
+    global _listener
+    _queue_handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    _listener = QueueListener(
+        _queue_handler.queue, _stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    # Writes out whatever is still queued.
+    if _listener is not None:
+        _listener.stop()
 
 
 def setup_logger() -> logging.Logger:
+    """
+    Configures the `project_name` logger. Safe to call more than once; later
+    calls return the already configured logger.
+    """
+
+    global _queue_handler, _stream_handler
     logger = logging.getLogger("project_name")
-    logger.setLevel(logging.INFO)
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    if _queue_handler is not None:
+        return logger
+
+    logger.setLevel(LOG_LEVEL)
+    _stream_handler = logging.StreamHandler()
+    _stream_handler.setFormatter(JsonFormatter())
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    sample_rates = parse_sample_rates(LOG_SAMPLE_RATES)
+    if sample_rates:
+        _queue_handler.addFilter(SamplingFilter(sample_rates))
+    _queue_handler.addFilter(
+        RepeatedErrorFilter(LOG_REPEAT_LIMIT, LOG_REPEAT_PERIOD_SECONDS)
     )
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
+    logger.addHandler(_queue_handler)
+
+    _start_listener()
+    atexit.register(_stop_listener)
+    # A forked child (e.g. a preloading server's worker) doesn't inherit the
+    # listener thread, and the queue's lock may have been held at the fork.
+    os.register_at_fork(after_in_child=_start_listener)
     return logger
@@ -0,0 +1,151 @@
+import time
+from contextvars import ContextVar
+from typing import Dict
+from typing import Tuple
+
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+UNMATCHED_ROUTE = "<unmatched>"
+# Anything else (clients can send arbitrary methods) is counted as OTHER.
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+# Its _count series doubles as the request counter, so a request costs one
+# metric update here rather than a histogram and a counter.
+REQUEST_DURATION_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Request latency, including streaming the response body.",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being handled.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+# Counters rather than histograms keep the hot path cheap; divide their rates
+# by http_request_duration_seconds_count for queries and database time per
+# request.
+REQUEST_DB_QUERIES = Counter(
+    "http_request_db_queries_total",
+    "Database queries executed while handling requests.",
+    ["method", "route"],
+)
+REQUEST_DB_SECONDS = Counter(
+    "http_request_db_seconds_total",
+    "Time spent executing database queries while handling requests.",
+    ["method", "route"],
+)
+
+
+class RequestDbStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Set for the duration of each request. Both the asyncpg greenlets and the
+# threadpool that runs sync endpoints inherit it.
+_request_db_stats: ContextVar[RequestDbStats | None] = ContextVar(
+    "request_db_stats", default=None
+)
+
+
+def get_request_db_stats() -> RequestDbStats | None:
+    return _request_db_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    # Kept on the execution context, which is discarded with the statement even
+    # when it raises, rather than on the pooled connection.
+    if context is not None and _request_db_stats.get() is not None:
+        context._metrics_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    started_at = getattr(context, "_metrics_started_at", None)
+    stats = _request_db_stats.get()
+    if started_at is None or stats is None:
+        return
+    stats.queries += 1
+    stats.seconds += time.perf_counter() - started_at
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status codes, in-flight requests
+    and per-request database usage. Routes are labelled by their template
+    (`/user/{username}`), never by the raw path, so label cardinality is
+    bounded by the number of routes.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # Resolving label children dominates the per-request cost; cache them,
+        # one lookup per request for the gauge and one for everything else.
+        self._in_progress: Dict[str, Gauge] = {}
+        self._request_metrics: Dict[Tuple[str, str, int], tuple] = {}
+
+    def _get_in_progress(self, method: str) -> Gauge:
+        in_progress = self._in_progress[method] = REQUESTS_IN_PROGRESS.labels(method)
+        return in_progress
+
+    def _get_request_metrics(self, key: Tuple[str, str, int]) -> tuple:
+        method, route, status = key
+        metrics = self._request_metrics[key] = (
+            REQUEST_DURATION_SECONDS.labels(method, route, status),
+            REQUEST_DB_QUERIES.labels(method, route),
+            REQUEST_DB_SECONDS.labels(method, route),
+        )
+        return metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        if method not in HTTP_METHODS:
+            method = "OTHER"
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = self._in_progress.get(method) or self._get_in_progress(method)
+        stats = RequestDbStats()
+        token = _request_db_stats.set(stats)
+        in_progress.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started_at
+            in_progress.dec()
+            _request_db_stats.reset(token)
+
+            # The router stores the matched route in the (shared) scope.
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            key = (method, route, status)
+            duration_seconds, db_queries, db_seconds = self._request_metrics.get(
+                key
+            ) or self._get_request_metrics(key)
+            duration_seconds.observe(duration)
+            if stats.queries:
+                db_queries.inc(stats.queries)
+                db_seconds.inc(stats.seconds)
@@ -0,0 +1,143 @@
+"""
+Per-request SQL statement budgets and N+1 detection.
+
+Routes declare the most statements they may execute with `@query_budget(n)`.
+With QUERY_BUDGET_MODE=warn every request is checked and violations are
+logged; with QUERY_BUDGET_MODE=raise the request fails with
+QueryBudgetExceeded, which `TestClient` re-raises in the calling test.
+tests/conftest.py sets raise mode; run the suite against a throwaway Postgres
+(the models use JSONB and Postgres-only indexes, so SQLite cannot stand in):
+
+    docker run --rm -p 5432:5432 -e POSTGRES_PASSWORD=postgres postgres:16
+    alembic upgrade head
+    pytest
+"""
+
+import logging
+from collections import Counter
+from collections.abc import Callable
+from contextvars import ContextVar
+from typing import Dict
+from typing import List
+from typing import TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_ATTRIBUTE = "__query_budget__"
+
+F = TypeVar("F", bound=Callable)
+
+
+def query_budget(max_queries: int) -> Callable[[F], F]:
+    """
+    Declares the most SQL statements a route may execute per request, counted
+    with every cache cold. Apply it below the router decorator.
+    """
+
+    def decorator(endpoint: F) -> F:
+        setattr(endpoint, QUERY_BUDGET_ATTRIBUTE, max_queries)
+        return endpoint
+
+    return decorator
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """
+    Records the statements executed by any engine in the current context
+    (including asyncpg greenlets and tasks started from it) while active.
+    """
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self._token = None
+
+    def __enter__(self) -> "QueryRecorder":
+        self._token = _active_recorder.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _active_recorder.reset(self._token)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, min_repeats: int = 2) -> Dict[str, int]:
+        """
+        Statements executed at least `min_repeats` times. Statements are
+        parameterized, so the same text with different parameters, typically
+        a lazy load inside a loop, shows up here as one entry.
+        """
+
+        return {
+            statement: count
+            for statement, count in Counter(self.statements).items()
+            if count >= min_repeats
+        }
+
+    def violations(self, max_queries: int | None, max_repeats: int) -> List[str]:
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"{self.count} statements, budget is {max_queries}")
+        for statement, count in self.repeated(max_repeats + 1).items():
+            problems.append(f"possible N+1, executed {count} times: {statement}")
+        return problems
+
+
+_active_recorder: ContextVar[QueryRecorder | None] = ContextVar(
+    "active_query_recorder", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, many):
+    recorder = _active_recorder.get()
+    if recorder is not None:
+        recorder.statements.append(statement)
+
+
+class QueryBudgetMiddleware:
+    """
+    Records each request's statements and checks them against the matched
+    route's `@query_budget`, and for statements repeated more than
+    `max_repeats` times.
+    """
+
+    def __init__(self, app: ASGIApp, raise_on_violation: bool, max_repeats: int):
+        self.app = app
+        self.raise_on_violation = raise_on_violation
+        self.max_repeats = max_repeats
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with QueryRecorder() as recorder:
+            await self.app(scope, receive, send)
+
+        route = scope.get("route")
+        endpoint = getattr(route, "endpoint", None)
+        problems = recorder.violations(
+            getattr(endpoint, QUERY_BUDGET_ATTRIBUTE, None), self.max_repeats
+        )
+        if not problems:
+            return
+
+        message = f"{scope['method']} {getattr(route, 'path', scope['path'])}: " + (
+            "; ".join(problems)
+        )
+        if self.raise_on_violation:
+            raise QueryBudgetExceeded(message)
+        logger.warning("Query budget exceeded by %s", message)
@@ -0,0 +1,193 @@
+"""
+Token-bucket rate limiting for the endpoints that are expensive to abuse.
+
+Buckets are tracked with the generic cell rate algorithm, which behaves exactly
+like a token bucket holding `capacity` tokens refilled over `period_seconds`
+but needs a single number per key: the theoretical arrival time (TAT) at which
+the bucket would be full again. A request is allowed if, after adding its
+share of the period, the TAT is at most one period ahead of now.
+"""
+
+import heapq
+import math
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Dict
+from typing import Tuple
+
+from fastapi import HTTPException
+from fastapi import status
+from prometheus_client import Counter
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from project_name.configs import FORGOT_PASSWORD_ACCOUNT_RATE_LIMIT
+from project_name.configs import FORGOT_PASSWORD_IP_RATE_LIMIT
+from project_name.configs import LOGIN_IP_RATE_LIMIT
+from project_name.configs import LOGIN_USERNAME_RATE_LIMIT
+from project_name.configs import RATE_LIMIT_BACKEND
+from project_name.configs import RATE_LIMIT_ENABLED
+from project_name.configs import RATE_LIMIT_MAX_KEYS
+from project_name.db.engine import get_async_session_factory
+from project_name.db.engine import get_session_factory
+from project_name.db.models import RateLimitBucket
+
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total",
+    "Requests rejected by a rate limit.",
+    ["limit"],
+)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    name: str
+    capacity: int
+    period_seconds: float
+
+    @property
+    def interval(self) -> float:
+        return self.period_seconds / self.capacity
+
+
+LOGIN_IP_LIMIT = RateLimit("login_ip", LOGIN_IP_RATE_LIMIT, 60)
+LOGIN_USERNAME_LIMIT = RateLimit("login_username", LOGIN_USERNAME_RATE_LIMIT, 60)
+FORGOT_PASSWORD_IP_LIMIT = RateLimit(
+    "forgot_password_ip", FORGOT_PASSWORD_IP_RATE_LIMIT, 3600
+)
+FORGOT_PASSWORD_ACCOUNT_LIMIT = RateLimit(
+    "forgot_password_account", FORGOT_PASSWORD_ACCOUNT_RATE_LIMIT, 3600
+)
+
+
+class InMemoryRateLimitStore:
+    """
+    Per-process store. Needs no lock: each call reads and writes its key with
+    no await in between, so it is atomic on the event loop.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._tats: Dict[str, float] = {}
+
+    def _evict(self, now: float) -> None:
+        # A key whose TAT has passed is equivalent to a full bucket.
+        self._tats = {key: tat for key, tat in self._tats.items() if tat > now}
+        if len(self._tats) >= self.max_keys:
+            # Still full of live keys (e.g. under a spray of spoofed values):
+            # rather than grow without bound, drop the half with the smallest
+            # TATs, the buckets closest to full, which loses the least state.
+            keys = heapq.nsmallest(
+                len(self._tats) // 2, self._tats, key=self._tats.__getitem__
+            )
+            for key in keys:
+                del self._tats[key]
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        """
+        Takes a token from `key`'s bucket. Returns 0 if one was available,
+        otherwise the seconds until one will be.
+        """
+
+        now = time.monotonic()
+        tat = max(self._tats.get(key, now), now) + limit.interval
+        if tat - now > limit.period_seconds:
+            return tat - now - limit.period_seconds
+        if key not in self._tats and len(self._tats) >= self.max_keys:
+            self._evict(now)
+        self._tats[key] = tat
+        return 0.0
+
+
+class PostgresRateLimitStore:
+    """
+    Store shared by every worker, kept in the unlogged rate_limit_bucket
+    table. Each check is one upsert that only advances the TAT when the request
+    is allowed, in its own short transaction so it counts even when the
+    request itself rolls back.
+    """
+
+    def __init__(self, get_session_factory: Callable[[], async_sessionmaker]):
+        # Resolved on first use so importing this module doesn't create the
+        # engine.
+        self.get_session_factory = get_session_factory
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        now = time.time()
+        next_tat = func.greatest(RateLimitBucket.tat, now) + limit.interval
+        async with self.get_session_factory()() as db_session:
+            tat = await db_session.scalar(
+                insert(RateLimitBucket)
+                .values(key=key, tat=now + limit.interval)
+                .on_conflict_do_update(
+                    index_elements=[RateLimitBucket.key],
+                    set_={"tat": next_tat},
+                    where=next_tat - now <= limit.period_seconds,
+                )
+                .returning(RateLimitBucket.tat)
+            )
+            if tat is not None:
+                await db_session.commit()
+                return 0.0
+            tat = await db_session.scalar(
+                select(RateLimitBucket.tat).where(RateLimitBucket.key == key)
+            )
+        return max(tat + limit.interval - now - limit.period_seconds, 0.001)
+
+
+def purge_rate_limit_buckets() -> int:
+    """
+    Deletes Postgres buckets that have refilled completely, which are
+    equivalent to absent ones.
+    """
+
+    with get_session_factory()() as db_session:
+        result = db_session.execute(
+            delete(RateLimitBucket).where(RateLimitBucket.tat < time.time())
+        )
+        db_session.commit()
+    return result.rowcount
+
+
+class RateLimiter:
+    def __init__(
+        self, store: InMemoryRateLimitStore | PostgresRateLimitStore, enabled: bool
+    ):
+        self.store = store
+        self.enabled = enabled
+
+    async def check(self, *limits: Tuple[RateLimit, str | None]) -> None:
+        """
+        Takes a token for each (limit, key) pair, raising 429 with Retry-After
+        on the first bucket that is empty. Call it before any expensive work.
+        """
+
+        if not self.enabled:
+            return
+        for limit, key in limits:
+            if not key:
+                continue
+            retry_after = await self.store.acquire(
+                f"{limit.name}:{key.strip().lower()}", limit
+            )
+            if retry_after:
+                RATE_LIMIT_REJECTIONS.labels(limit.name).inc()
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests, please try again later",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+
+
+rate_limiter = RateLimiter(
+    (
+        PostgresRateLimitStore(get_async_session_factory)
+        if RATE_LIMIT_BACKEND == "postgres"
+        else InMemoryRateLimitStore()
+    ),
+    enabled=RATE_LIMIT_ENABLED,
+)
@@ -0,0 +1,13 @@
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class ModelResponse(JSONResponse):
+    """
+    Renders a Pydantic model to JSON bytes in pydantic-core. Returning one from a
+    handler skips FastAPI's jsonable_encoder pass over the model. Set cookies on
+    this response itself: those set on an injected `Response` are not merged.
+    """
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.model_dump_json().encode("utf-8")
@@ -0,0 +1,193 @@
+"""
+Access token revocation without a database round trip per request.
+
+Every access token carries `uid`, `iat` and `jti` claims. A token is revoked
+if it was issued before its user's watermark, which is moved forward when the
+password changes or the user is deleted, or if its `jti` was revoked on
+logout. Revocations are written to Postgres in the caller's transaction and
+held in memory by every worker: all of them at startup, then every
+`refresh_seconds` only the rows recorded since the previous load. They take
+effect at once in the worker that made them and within the refresh interval
+in the others.
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+from typing import Dict
+
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from project_name.configs import ACCESS_TOKEN_EXPIRE_MINUTES
+from project_name.configs import TOKEN_REVOCATION_REFRESH_SECONDS
+from project_name.db.engine import get_async_session_factory
+from project_name.db.engine import get_session_factory
+from project_name.db.models import RevokedToken
+from project_name.db.models import TokenRevocationWatermark
+
+logger = logging.getLogger(__name__)
+
+# Tokens issued before a watermark older than this have all expired.
+TOKEN_LIFETIME_SECONDS = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+# Rows are stamped with their transaction's start time but only become
+# visible at commit, so each refresh also rereads this far before the last.
+REFRESH_OVERLAP = datetime.timedelta(seconds=60)
+
+
+def _jti_key(jti: str) -> bytes:
+    # jtis are uuid4 hex; their 16 raw bytes take less memory in the set.
+    return bytes.fromhex(jti)
+
+
+class TokenRevocations:
+    def __init__(self, refresh_seconds: float = TOKEN_REVOCATION_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        # user id -> epoch seconds before which its tokens are revoked
+        self._not_before: Dict[int, float] = {}
+        # revoked jti -> its token's expiry, in epoch seconds
+        self._revoked: Dict[bytes, float] = {}
+        self._loaded_until: datetime.datetime | None = None
+
+    def __len__(self) -> int:
+        return len(self._not_before) + len(self._revoked)
+
+    def is_revoked(self, claims: dict) -> bool:
+        user_id = claims.get("uid")
+        issued_at = claims.get("iat")
+        jti = claims.get("jti")
+        if user_id is None or issued_at is None or jti is None:
+            # Issued before revocation was supported, so it can't be checked.
+            return True
+
+        not_before = self._not_before.get(user_id)
+        if not_before is not None and issued_at < not_before:
+            return True
+        try:
+            return _jti_key(jti) in self._revoked
+        except ValueError:
+            return True
+
+    async def revoke_user_tokens(self, db_session: AsyncSession, user_id: int) -> None:
+        """
+        Revokes every token issued to `user_id` so far. Commit the session to
+        persist it; tokens issued afterwards are unaffected.
+        """
+
+        not_before = time.time()
+        statement = insert(TokenRevocationWatermark).values(
+            user_id=user_id, not_before=not_before, updated_at=func.now()
+        )
+        await db_session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[TokenRevocationWatermark.user_id],
+                set_={
+                    "not_before": func.greatest(
+                        TokenRevocationWatermark.not_before,
+                        statement.excluded.not_before,
+                    ),
+                    "updated_at": statement.excluded.updated_at,
+                },
+            )
+        )
+        self._not_before[user_id] = max(self._not_before.get(user_id, 0), not_before)
+
+    async def revoke_token(self, db_session: AsyncSession, claims: dict) -> None:
+        """
+        Revokes the single token with these (verified) claims. Commit the
+        session to persist it.
+        """
+
+        await db_session.execute(
+            insert(RevokedToken)
+            .values(jti=claims["jti"], expires_at=claims["exp"], revoked_at=func.now())
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        )
+        self._revoked[_jti_key(claims["jti"])] = claims["exp"]
+
+    async def refresh(self, db_session: AsyncSession) -> int:
+        """
+        Loads the revocations recorded since the previous refresh (all of them
+        on the first) and forgets the ones that no longer matter. Returns the
+        number of rows read.
+        """
+
+        loaded_until = await db_session.scalar(select(func.localtimestamp()))
+        watermarks = select(
+            TokenRevocationWatermark.user_id, TokenRevocationWatermark.not_before
+        )
+        revoked = select(RevokedToken.jti, RevokedToken.expires_at).where(
+            RevokedToken.expires_at > time.time()
+        )
+        if self._loaded_until is not None:
+            since = self._loaded_until - REFRESH_OVERLAP
+            watermarks = watermarks.where(TokenRevocationWatermark.updated_at >= since)
+            revoked = revoked.where(RevokedToken.revoked_at >= since)
+        watermark_rows = (await db_session.execute(watermarks)).all()
+        revoked_rows = (await db_session.execute(revoked)).all()
+
+        # No awaits from here on, so revocations made by requests in the
+        # meantime are already in the dicts being rebuilt.
+        now = time.time()
+        not_before = {
+            user_id: value
+            for user_id, value in self._not_before.items()
+            if value > now - TOKEN_LIFETIME_SECONDS
+        }
+        for user_id, value in watermark_rows:
+            not_before[user_id] = max(not_before.get(user_id, 0), value)
+        revoked_tokens = {
+            key: expires_at
+            for key, expires_at in self._revoked.items()
+            if expires_at > now
+        }
+        for jti, expires_at in revoked_rows:
+            revoked_tokens[_jti_key(jti)] = expires_at
+
+        self._not_before = not_before
+        self._revoked = revoked_tokens
+        self._loaded_until = loaded_until
+        return len(watermark_rows) + len(revoked_rows)
+
+    async def load(self) -> int:
+        async with get_async_session_factory()() as db_session:
+            return await self.refresh(db_session)
+
+    async def run(self) -> None:
+        """
+        Refreshes every `refresh_seconds` until cancelled. Start it after the
+        initial `load()`.
+        """
+
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.load()
+            except Exception:
+                logger.exception("Failed to refresh token revocations")
+
+
+def purge_token_revocations() -> int:
+    """
+    Deletes revocations of tokens that have expired anyway.
+    """
+
+    now = time.time()
+    with get_session_factory()() as db_session:
+        purged = db_session.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at < now)
+        ).rowcount
+        purged += db_session.execute(
+            delete(TokenRevocationWatermark).where(
+                TokenRevocationWatermark.not_before < now - TOKEN_LIFETIME_SECONDS
+            )
+        ).rowcount
+        db_session.commit()
+    return purged
+
+
+token_revocations = TokenRevocations()
@@ -0,0 +1,91 @@
+import logging
+import threading
+
+from apscheduler.schedulers.base import BaseScheduler
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_try_advisory_lock.
+SCHEDULER_LOCK_KEY = 7_203_114_511
+
+
+class SchedulerLeaderElection:
+    """
+    Keeps a scheduler paused in every worker except the one holding a
+    session-level Postgres advisory lock.
+
+    The lock lives on a dedicated connection, so it is released as soon as the
+    leader's process or connection dies. The other workers keep retrying the
+    lock every `retry_seconds` and the first to get it takes over.
+    """
+
+    def __init__(self, scheduler: BaseScheduler, engine: Engine, retry_seconds: float):
+        self.scheduler = scheduler
+        self.engine = engine
+        self.retry_seconds = retry_seconds
+        self.is_leader = False
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="scheduler-leader-election", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.retry_seconds)
+
+    def _set_leader(self, is_leader: bool) -> None:
+        if is_leader == self.is_leader:
+            return
+        self.is_leader = is_leader
+        if is_leader:
+            logger.info("Acquired scheduler lock; running scheduled jobs here")
+            self.scheduler.resume()
+        else:
+            logger.info("Lost scheduler lock; pausing scheduled jobs")
+            self.scheduler.pause()
+
+    def _poll(self, connection: Connection) -> None:
+        if self.is_leader:
+            # Fails if the connection, and with it the lock, has been lost.
+            connection.execute(text("SELECT 1"))
+        else:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": SCHEDULER_LOCK_KEY}
+            ).scalar_one()
+            self._set_leader(acquired)
+        # The lock is session-level; don't sit idle in a transaction.
+        connection.commit()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                connection = self.engine.connect()
+                while not self._stopping.is_set():
+                    self._poll(connection)
+                    self._stopping.wait(self.retry_seconds)
+
+                if self.is_leader:
+                    connection.execute(
+                        text("SELECT pg_advisory_unlock(:key)"),
+                        {"key": SCHEDULER_LOCK_KEY},
+                    )
+                    connection.commit()
+                connection.close()
+            except Exception:
+                logger.exception("Scheduler leader election failed; retrying")
+                if connection is not None:
+                    # Never return a connection that may still hold the lock.
+                    connection.invalidate()
+                    connection.close()
+                self._stopping.wait(self.retry_seconds)
+            finally:
+                self._set_leader(False)
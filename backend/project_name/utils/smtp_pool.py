@@ -0,0 +1,151 @@
+import smtplib
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.message import Message
+
+# Errors after which a connection can no longer be trusted and must be replaced.
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+@dataclass
+class SMTPPoolStats:
+    connections_opened: int = 0
+    connections_discarded: int = 0
+    keepalive_checks: int = 0
+    reconnects: int = 0
+    messages_sent: int = 0
+
+
+class SMTPConnectionPool:
+    """
+    Thread-safe pool of authenticated SMTP connections.
+
+    Idle connections are checked with NOOP before reuse once they have been idle
+    for longer than `keepalive_seconds`, and replaced if the server dropped them.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        username: str | None = None,
+        password: str | None = None,
+        use_ssl: bool = True,
+        max_connections: int = 2,
+        keepalive_seconds: float = 30,
+        timeout_seconds: float = 30,
+        max_reconnects: int = 2,
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.keepalive_seconds = keepalive_seconds
+        self.timeout_seconds = timeout_seconds
+        self.max_reconnects = max_reconnects
+        self.stats = SMTPPoolStats()
+
+        self._idle: deque[tuple[smtplib.SMTP, float]] = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        connection = smtp_class(self.host, self.port, timeout=self.timeout_seconds)
+        connection.ehlo()
+        if self.password:
+            connection.login(self.username or self.sender, self.password)
+        self.stats.connections_opened += 1
+        return connection
+
+    def _discard(self, connection: smtplib.SMTP) -> None:
+        self.stats.connections_discarded += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_alive(self, connection: smtplib.SMTP, last_used: float) -> bool:
+        if time.monotonic() - last_used < self.keepalive_seconds:
+            return True
+
+        self.stats.keepalive_checks += 1
+        try:
+            return connection.noop()[0] == 250
+        except (smtplib.SMTPException, *_CONNECTION_ERRORS):
+            return False
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, last_used = self._idle.pop()
+
+            if self._is_alive(connection, last_used):
+                return connection
+            self._discard(connection)
+
+        return self._connect()
+
+    def _checkin(self, connection: smtplib.SMTP) -> None:
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        with self._slots:
+            connection = self._checkout()
+            try:
+                yield connection
+            except BaseException:
+                # The session may be dead or mid-transaction; don't hand it out again.
+                self._discard(connection)
+                raise
+            else:
+                self._checkin(connection)
+
+    def send_many(self, messages: Iterable[tuple[str, Message]]) -> None:
+        """
+        Sends every (recipient, message) pair over a single authenticated session,
+        reconnecting and resuming from the failed message if the server drops it.
+        """
+
+        pending = deque(messages)
+        reconnects = 0
+
+        while pending:
+            try:
+                with self.connection() as connection:
+                    while pending:
+                        email_to, msg = pending[0]
+                        connection.sendmail(self.sender, email_to, msg.as_string())
+                        pending.popleft()
+                        self.stats.messages_sent += 1
+            except _CONNECTION_ERRORS:
+                reconnects += 1
+                self.stats.reconnects += 1
+                if reconnects > self.max_reconnects:
+                    raise
+
+    def send(self, email_to: str, msg: Message) -> None:
+        self.send_many([(email_to, msg)])
+
+    def close(self) -> None:
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+
+        for connection, _ in idle:
+            try:
+                connection.quit()
+            except (smtplib.SMTPException, *_CONNECTION_ERRORS):
+                self._discard(connection)
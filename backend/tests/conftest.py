@@ -0,0 +1,86 @@
+"""
+Routes run with QUERY_BUDGET_MODE=raise, so a request that executes more
+statements than its `@query_budget` (or repeats one, N+1 style) fails the test
+with QueryBudgetExceeded. `api_client` needs the Postgres configured in
+project_name/.env (or the POSTGRES_* environment variables), migrated to head:
+
+    alembic upgrade head
+    pytest
+
+Tests using it are skipped when that database is unreachable.
+"""
+
+import os
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+
+# configs.py reads these at import; .env does not override them.
+os.environ["QUERY_BUDGET_MODE"] = "raise"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+
+@asynccontextmanager
+async def _lifespan(_application):
+    # Without the scheduler, revocation refresh and cache warming: each test
+    # starts cold, which is what the budgets are declared for.
+    yield
+    from project_name.db.engine import dispose_engines
+
+    await dispose_engines()
+
+
+def _delete_test_users(prefix: str) -> None:
+    from sqlalchemy import text
+
+    from project_name.db.engine import get_sqlalchemy_engine
+
+    # revoked_token rows aren't linked to users; they are purged once the
+    # token expires, like any other.
+    users = 'SELECT id FROM "user" WHERE username LIKE :prefix'
+    with get_sqlalchemy_engine().begin() as connection:
+        for statement in (
+            f"DELETE FROM reset_password_request WHERE user_id IN ({users})",
+            f"DELETE FROM token_revocation_watermark WHERE user_id IN ({users})",
+            "DELETE FROM email_outbox WHERE email_to LIKE :prefix",
+            'DELETE FROM "user" WHERE username LIKE :prefix',
+        ):
+            connection.execute(text(statement), {"prefix": f"{prefix}%"})
+
+
+@pytest.fixture
+def test_user_prefix() -> str:
+    """
+    Prefix for the usernames and emails a test creates; they are deleted
+    afterwards.
+    """
+
+    return f"test{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture
+def api_client(test_user_prefix):
+    from fastapi.testclient import TestClient
+    from sqlalchemy import inspect
+    from sqlalchemy.exc import OperationalError
+
+    from project_name.db.engine import get_sqlalchemy_engine
+    from project_name.main import app
+
+    try:
+        with get_sqlalchemy_engine().connect() as connection:
+            migrated = inspect(connection).has_table("email_outbox")
+    except OperationalError as e:
+        pytest.skip(f"Postgres is not available: {e.orig}")
+    if not migrated:
+        pytest.skip("Postgres is not migrated; run `alembic upgrade head`")
+
+    lifespan = app.router.lifespan_context
+    app.router.lifespan_context = _lifespan
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.router.lifespan_context = lifespan
+        _delete_test_users(test_user_prefix)
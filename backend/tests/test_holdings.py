@@ -0,0 +1,190 @@
+"""
+Snapshot replay, driven through the ORM so the after_flush hook runs. SQLite
+stands in for Postgres; the advisory lock is skipped on it.
+"""
+
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from project_name.db.models import Base
+from project_name.db.models import Portfolio
+from project_name.db.models import PortfolioHolding
+from project_name.db.models import PortfolioHoldingSnapshot
+from project_name.db.models import Transaction
+from project_name.db.models import User
+from project_name.modules.holdings import _apply_transaction
+from project_name.modules.holdings import replay_holdings
+from project_name.modules.holdings import SELL_TRANSACTION_TYPE
+
+TABLES = [
+    User.__table__,
+    Portfolio.__table__,
+    Transaction.__table__,
+    PortfolioHoldingSnapshot.__table__,
+    PortfolioHolding.__table__,
+]
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=TABLES)
+    with Session(engine) as session:
+        user = User(username="user", email="user@example.com", hashed_password="x")
+        session.add(user)
+        session.flush()
+        session.add_all(
+            [
+                Portfolio(id=1, user_id=user.id, name="first"),
+                Portfolio(id=2, user_id=user.id, name="second"),
+            ]
+        )
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def _trade(day, quantity, price_cents, ticker="AAA", portfolio_id=1, sell=False):
+    return Transaction(
+        portfolio_id=portfolio_id,
+        user_id=1,
+        ticker=ticker,
+        price_cents=price_cents,
+        quantity=quantity,
+        transaction_type=SELL_TRANSACTION_TYPE if sell else "BUY",
+        purchased_at=datetime.datetime(2024, 1, day, 12),
+    )
+
+
+def _snapshots(session, portfolio_id=1, ticker="AAA"):
+    return session.execute(
+        select(
+            PortfolioHoldingSnapshot.as_of,
+            PortfolioHoldingSnapshot.quantity,
+            PortfolioHoldingSnapshot.cost_basis_cents,
+        )
+        .where(PortfolioHoldingSnapshot.portfolio_id == portfolio_id)
+        .where(PortfolioHoldingSnapshot.ticker == ticker)
+        .order_by(PortfolioHoldingSnapshot.as_of)
+    ).all()
+
+
+def _holdings(session, portfolio_id=1):
+    return session.execute(
+        select(
+            PortfolioHolding.ticker,
+            PortfolioHolding.as_of,
+            PortfolioHolding.quantity,
+            PortfolioHolding.cost_basis_cents,
+        )
+        .where(PortfolioHolding.portfolio_id == portfolio_id)
+        .order_by(PortfolioHolding.ticker)
+    ).all()
+
+
+def _day(day):
+    return datetime.date(2024, 1, day)
+
+
+def test_sell_removes_average_cost():
+    quantity, cost_basis_cents = _apply_transaction(0.0, 0.0, "BUY", 2, 100)
+    quantity, cost_basis_cents = _apply_transaction(
+        quantity, cost_basis_cents, "BUY", 2, 200
+    )
+    assert (quantity, cost_basis_cents) == (4, 600)
+    assert _apply_transaction(
+        quantity, cost_basis_cents, SELL_TRANSACTION_TYPE, 1, 500
+    ) == (3, 450)
+
+
+def test_sell_from_empty_position_has_no_cost_basis():
+    assert _apply_transaction(0.0, 0.0, SELL_TRANSACTION_TYPE, 1, 100) == (-1, 0)
+
+
+def test_one_snapshot_per_trading_day(db_session):
+    db_session.add_all([_trade(1, 2, 100), _trade(1, 2, 200), _trade(3, 1, 300)])
+    db_session.commit()
+
+    assert _snapshots(db_session) == [(_day(1), 4, 600), (_day(3), 5, 900)]
+
+
+def test_backdated_trade_replays_from_its_date(db_session):
+    db_session.add_all([_trade(1, 2, 100), _trade(5, 2, 300, sell=True)])
+    db_session.commit()
+    assert _snapshots(db_session) == [(_day(1), 2, 200), (_day(5), 0, 0)]
+
+    db_session.add(_trade(3, 2, 200))
+    db_session.commit()
+
+    assert _snapshots(db_session) == [
+        (_day(1), 2, 200),
+        (_day(3), 4, 600),
+        (_day(5), 2, 300),
+    ]
+    assert _holdings(db_session) == [("AAA", _day(5), 2, 300)]
+
+
+def test_moved_trade_replays_old_and_new_holdings(db_session):
+    trade = _trade(2, 3, 100)
+    db_session.add_all([_trade(1, 1, 100), trade])
+    db_session.commit()
+
+    trade.ticker = "BBB"
+    trade.portfolio_id = 2
+    db_session.commit()
+
+    assert _snapshots(db_session) == [(_day(1), 1, 100)]
+    assert _snapshots(db_session, portfolio_id=2, ticker="BBB") == [(_day(2), 3, 300)]
+    assert _holdings(db_session) == [("AAA", _day(1), 1, 100)]
+    assert _holdings(db_session, portfolio_id=2) == [("BBB", _day(2), 3, 300)]
+
+
+def test_deleted_trade_is_replayed_away(db_session):
+    trade = _trade(2, 3, 100)
+    db_session.add_all([_trade(1, 1, 100), trade])
+    db_session.commit()
+
+    db_session.delete(trade)
+    db_session.commit()
+
+    assert _snapshots(db_session) == [(_day(1), 1, 100)]
+    assert _holdings(db_session) == [("AAA", _day(1), 1, 100)]
+
+
+def test_closed_positions_have_no_holding(db_session):
+    # 0.1 + 0.2 - 0.3 leaves float residue, not zero.
+    db_session.add_all(
+        [
+            _trade(1, 0.1, 100),
+            _trade(1, 0.2, 100),
+            _trade(2, 0.3, 100, sell=True),
+            _trade(2, 1, 100, ticker="BBB"),
+        ]
+    )
+    db_session.commit()
+
+    assert _snapshots(db_session)[-1].quantity != 0
+    assert _holdings(db_session) == [("BBB", _day(2), 1, 100)]
+
+
+def test_partial_replay_matches_full_replay(db_session):
+    db_session.add_all(
+        [
+            _trade(1, 4, 100),
+            _trade(2, 1, 150, sell=True),
+            _trade(4, 2, 250),
+            _trade(6, 3, 400, sell=True),
+        ]
+    )
+    db_session.commit()
+    incremental = _snapshots(db_session)
+
+    holdings = _holdings(db_session)
+
+    replay_holdings(db_session.connection(), 1, "AAA", datetime.date.min)
+    assert _snapshots(db_session) == incremental
+    assert _holdings(db_session) == holdings
@@ -0,0 +1,34 @@
+import asyncio
+import datetime
+from types import SimpleNamespace
+
+from project_name.modules.index_prices import IndexPriceCache
+
+
+class _Session:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        # Let the other requests reach the lock while this one holds it.
+        await asyncio.sleep(0)
+        rows, self.rows = self.rows, []
+        return SimpleNamespace(all=lambda: rows)
+
+
+def test_concurrent_stale_requests_refresh_once():
+    db_session = _Session(
+        [SimpleNamespace(date=datetime.datetime(2024, 1, 2), open_price_cents=100)]
+    )
+    cache = IndexPriceCache(refresh_seconds=60)
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.get_series(db_session, "SPY") for _ in range(5))
+        )
+
+    series = asyncio.run(main())
+    assert db_session.queries == 1
+    assert all(len(each) == 1 for each in series)
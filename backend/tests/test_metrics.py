@@ -0,0 +1,57 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from project_name.utils.metrics import _request_db_stats
+from project_name.utils.metrics import MetricsMiddleware
+from project_name.utils.metrics import RequestDbStats
+
+
+def _requests(route: str, status: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "http_request_duration_seconds_count",
+            {"method": "GET", "route": route, "status": status},
+        )
+        or 0
+    )
+
+
+def test_requests_are_counted_by_route_template_and_status():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics-test/{name}")
+    async def get(name: str):
+        return {"name": name}
+
+    before = _requests("/metrics-test/{name}", "200")
+    with TestClient(app) as client:
+        client.get("/metrics-test/first")
+        client.get("/metrics-test/second")
+        assert client.get("/metrics-test-missing").status_code == 404
+
+    assert _requests("/metrics-test/{name}", "200") == before + 2
+    assert _requests("<unmatched>", "404") >= 1
+
+
+def test_failed_statements_are_not_counted_or_kept():
+    engine = create_engine("sqlite://")
+    stats = RequestDbStats()
+    token = _request_db_stats.set(stats)
+    try:
+        with engine.connect() as connection:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    connection.execute(text("SELECT * FROM missing"))
+            connection.execute(text("SELECT 1"))
+            assert not connection.info
+    finally:
+        _request_db_stats.reset(token)
+        engine.dispose()
+
+    assert stats.queries == 1
@@ -0,0 +1,137 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from project_name.db.engine import get_sqlalchemy_engine
+from project_name.db.models import ResetPasswordRequest
+from project_name.db.models import User
+from project_name.utils.auth import jwt_decode_cache
+from project_name.utils.auth import user_cache
+from project_name.utils.query_budget import query_budget
+from project_name.utils.query_budget import QueryBudgetExceeded
+from project_name.utils.query_budget import QueryBudgetMiddleware
+
+PASSWORD = "correct horse battery"
+
+
+@pytest.fixture(scope="module")
+def budget_client():
+    """
+    A bare app with the middleware in raise mode over in-memory SQLite.
+    """
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    app = FastAPI()
+    app.add_middleware(QueryBudgetMiddleware, raise_on_violation=True, max_repeats=3)
+
+    async def execute(statements):
+        async with engine.connect() as connection:
+            for statement in statements:
+                await connection.execute(text(statement))
+        return {"statements": len(statements)}
+
+    @app.get("/within-budget")
+    @query_budget(2)
+    async def within_budget():
+        return await execute(["SELECT 1", "SELECT 2"])
+
+    @app.get("/over-budget")
+    @query_budget(1)
+    async def over_budget():
+        return await execute(["SELECT 1", "SELECT 2"])
+
+    @app.get("/repeated")
+    @query_budget(10)
+    async def repeated():
+        return await execute(["SELECT 1"] * 4)
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_request_within_budget_passes(budget_client):
+    assert budget_client.get("/within-budget").json() == {"statements": 2}
+
+
+def test_request_over_budget_raises(budget_client):
+    with pytest.raises(QueryBudgetExceeded, match="2 statements, budget is 1"):
+        budget_client.get("/over-budget")
+
+
+def test_repeated_statement_raises(budget_client):
+    with pytest.raises(QueryBudgetExceeded, match="possible N\\+1, executed 4 times"):
+        budget_client.get("/repeated")
+
+
+def _request(client, method, url, **kwargs):
+    # Budgets are declared for cold caches.
+    user_cache.clear()
+    jwt_decode_cache.clear()
+    response = client.request(method, url, **kwargs)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_budgeted_routes_stay_within_budget(api_client, test_user_prefix):
+    username = test_user_prefix
+    email = f"{test_user_prefix}@example.com"
+    other = f"{test_user_prefix}other"
+
+    for name in (username, other):
+        _request(
+            api_client,
+            "POST",
+            "/auth/register",
+            json={
+                "username": name,
+                "email": f"{name}@example.com",
+                "password": PASSWORD,
+                "confirm_password": PASSWORD,
+            },
+        )
+    _request(
+        api_client,
+        "POST",
+        "/auth/token",
+        json={"username": username, "password": PASSWORD},
+    )
+
+    _request(api_client, "GET", "/user/me")
+    _request(
+        api_client,
+        "POST",
+        "/user/update",
+        json={"old_password": PASSWORD, "new_password": PASSWORD},
+    )
+    _request(api_client, "POST", f"/user/demote/{other}")
+    _request(api_client, "POST", f"/user/promote/{other}")
+    _request(api_client, "GET", "/user/list", params={"username_prefix": username})
+    _request(api_client, "GET", "/email/create-data-request")
+    _request(
+        api_client,
+        "POST",
+        "/auth/forgot-password",
+        json={"email_or_username": email},
+    )
+    _request(api_client, "POST", "/auth/logout")
+
+    with get_sqlalchemy_engine().connect() as connection:
+        uuid_token = connection.scalar(
+            select(ResetPasswordRequest.uuid_token)
+            .join(User)
+            .where(User.username == username)
+        )
+    _request(
+        api_client,
+        "POST",
+        "/auth/reset-password",
+        json={
+            "reset_password_request_id": uuid_token,
+            "password": PASSWORD,
+            "confirm_password": PASSWORD,
+        },
+    )
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from project_name.utils.rate_limit import InMemoryRateLimitStore
+from project_name.utils.rate_limit import RateLimit
+
+LIMIT = RateLimit("test", capacity=2, period_seconds=60)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000.0]
+    monkeypatch.setattr("project_name.utils.rate_limit.time.monotonic", lambda: now[0])
+    return now
+
+
+def _acquire(store, key, limit=LIMIT):
+    return asyncio.run(store.acquire(key, limit))
+
+
+def test_bucket_empties_and_refills(clock):
+    store = InMemoryRateLimitStore()
+    assert _acquire(store, "a") == 0
+    assert _acquire(store, "a") == 0
+    assert _acquire(store, "a") == pytest.approx(30)
+
+    clock[0] += 30
+    assert _acquire(store, "a") == 0
+
+
+def test_eviction_drops_expired_keys_first(clock):
+    store = InMemoryRateLimitStore(max_keys=3)
+    _acquire(store, "expired", RateLimit("short", capacity=1, period_seconds=1))
+    _acquire(store, "a")
+    _acquire(store, "b")
+    clock[0] += 5
+
+    _acquire(store, "c")
+    assert set(store._tats) == {"a", "b", "c"}
+
+
+def test_eviction_drops_smallest_tats_when_full(clock):
+    store = InMemoryRateLimitStore(max_keys=4)
+    # Inserted first, but the furthest from a full bucket.
+    _acquire(store, "busy")
+    _acquire(store, "busy")
+    for key in ("a", "b", "c"):
+        _acquire(store, key)
+
+    _acquire(store, "d")
+    assert set(store._tats) == {"busy", "c", "d"}
@@ -0,0 +1,137 @@
+"""
+Round trips and raiseload behaviour of the User aggregate queries, on an
+in-memory SQLite database.
+"""
+
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from project_name.db.models import Base
+from project_name.db.models import Portfolio
+from project_name.db.models import PortfolioHolding
+from project_name.db.models import PortfolioHoldingSnapshot
+from project_name.db.models import ResetPasswordRequest
+from project_name.db.models import Transaction
+from project_name.db.models import User
+from project_name.db.models import UserPreferences
+from project_name.modules.repository import get_user_aggregate
+from project_name.modules.repository import list_portfolio_summaries
+from project_name.modules.repository import select_user_with_preferences
+
+TABLES = [
+    User.__table__,
+    UserPreferences.__table__,
+    ResetPasswordRequest.__table__,
+    Portfolio.__table__,
+    Transaction.__table__,
+    PortfolioHoldingSnapshot.__table__,
+    PortfolioHolding.__table__,
+]
+
+
+async def _seed(db_session: AsyncSession) -> int:
+    user = User(username="user", email="user@example.com", hashed_password="x")
+    user.preferences = UserPreferences(strategy_display_option="spy")
+    db_session.add(user)
+    await db_session.flush()
+    for name, trades in (("first", 3), ("second", 0), ("third", 1)):
+        portfolio = Portfolio(user_id=user.id, name=name)
+        db_session.add(portfolio)
+        await db_session.flush()
+        db_session.add_all(
+            Transaction(
+                portfolio_id=portfolio.id,
+                user_id=user.id,
+                ticker="AAA",
+                price_cents=100,
+                quantity=1,
+                transaction_type="BUY",
+                purchased_at=datetime.datetime(2024, 1, day + 1),
+            )
+            for day in range(trades)
+        )
+    await db_session.commit()
+    return user.id
+
+
+@pytest.fixture
+def run_queries():
+    """
+    Runs `queries(db_session, user_id)` against a freshly seeded database and
+    returns its result with the number of statements it executed.
+    """
+
+    def run(queries):
+        async def main():
+            engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all, tables=TABLES)
+            async with AsyncSession(engine, expire_on_commit=False) as db_session:
+                user_id = await _seed(db_session)
+            statements = []
+            event.listen(
+                engine.sync_engine,
+                "before_cursor_execute",
+                lambda *args: statements.append(args[2]),
+            )
+            try:
+                async with AsyncSession(engine) as db_session:
+                    return await queries(db_session, user_id), len(statements)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+def test_user_aggregate_loads_in_three_round_trips(run_queries):
+    async def queries(db_session, user_id):
+        user = await get_user_aggregate(db_session, user_id)
+        return (
+            user.preferences.strategy_display_option,
+            sorted(portfolio.name for portfolio in user.portfolios),
+            len(user.transactions),
+        )
+
+    loaded, statements = run_queries(queries)
+    assert loaded == ("spy", ["first", "second", "third"], 4)
+    assert statements == 3
+
+
+def test_user_aggregate_raises_on_unlisted_relations(run_queries):
+    async def queries(db_session, user_id):
+        user = await get_user_aggregate(db_session, user_id)
+        with pytest.raises(InvalidRequestError, match="lazy='raise'"):
+            user.reset_password_requests
+
+    run_queries(queries)
+
+
+def test_user_with_preferences_is_one_round_trip(run_queries):
+    async def queries(db_session, user_id):
+        user = await db_session.scalar(select_user_with_preferences(user_id))
+        with pytest.raises(InvalidRequestError, match="lazy='raise'"):
+            user.portfolios
+        return user.preferences.strategy_display_option
+
+    loaded, statements = run_queries(queries)
+    assert loaded == "spy"
+    assert statements == 1
+
+
+def test_portfolio_summaries_count_transactions(run_queries):
+    async def queries(db_session, user_id):
+        summaries = await list_portfolio_summaries(db_session, user_id)
+        return [(row.name, row.transaction_count) for row in summaries]
+
+    summaries, statements = run_queries(queries)
+    assert summaries == [("first", 3), ("second", 0), ("third", 1)]
+    assert statements == 1
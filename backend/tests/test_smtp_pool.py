@@ -0,0 +1,143 @@
+"""
+SMTPConnectionPool against a minimal in-process SMTP server that can drop
+connections on demand.
+"""
+
+import smtplib
+import socket
+import socketserver
+import threading
+from email.message import EmailMessage
+
+import pytest
+
+from project_name.utils.smtp_pool import SMTPConnectionPool
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections.append(self.connection)
+        self.reply("220 localhost")
+        while line := self.rfile.readline().decode().strip():
+            command = line.split(" ", 1)[0].upper()
+            if command == "MAIL":
+                with server.lock:
+                    drop = server.drop_before_message == len(server.delivered)
+                    if drop:
+                        server.drop_before_message = None
+                if drop:
+                    return
+            if command == "NOOP":
+                server.noops += 1
+            if command == "RCPT":
+                recipient = line.split(":", 1)[1].strip("<> ")
+            if command == "DATA":
+                self.reply("354 go ahead")
+                while self.rfile.readline() != b".\r\n":
+                    pass
+                with server.lock:
+                    server.delivered.append(recipient)
+            if command == "QUIT":
+                self.reply("221 bye")
+                return
+            self.reply("250 ok")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = []
+        self.delivered = []
+        self.noops = 0
+        # Closes the connection, unanswered, on the MAIL command of the message
+        # with this index.
+        self.drop_before_message = None
+
+    def drop_connections(self) -> None:
+        with self.lock:
+            for connection in self.connections:
+                # close() would leave the handler's file object holding it open.
+                connection.shutdown(socket.SHUT_RDWR)
+
+
+@pytest.fixture
+def server():
+    server = _SMTPServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _pool(server, **kwargs) -> SMTPConnectionPool:
+    return SMTPConnectionPool(
+        "127.0.0.1",
+        server.server_address[1],
+        sender="sender@example.com",
+        use_ssl=False,
+        timeout_seconds=5,
+        **kwargs,
+    )
+
+
+def _message(email_to: str) -> tuple[str, EmailMessage]:
+    msg = EmailMessage()
+    msg["To"] = email_to
+    msg.set_content("hello")
+    return email_to, msg
+
+
+def test_idle_connection_is_checked_with_noop_and_reused(server):
+    pool = _pool(server, keepalive_seconds=0)
+    pool.send(*_message("a@example.com"))
+    pool.send(*_message("b@example.com"))
+
+    assert server.delivered == ["a@example.com", "b@example.com"]
+    assert server.noops == 1
+    assert pool.stats.keepalive_checks == 1
+    assert pool.stats.connections_opened == 1
+    pool.close()
+
+
+def test_dropped_idle_connection_is_replaced(server):
+    pool = _pool(server, keepalive_seconds=0)
+    pool.send(*_message("a@example.com"))
+    server.drop_connections()
+    pool.send(*_message("b@example.com"))
+
+    assert server.delivered == ["a@example.com", "b@example.com"]
+    assert pool.stats.connections_opened == 2
+    assert pool.stats.connections_discarded == 1
+    assert pool.stats.reconnects == 0
+    pool.close()
+
+
+def test_send_many_resumes_from_the_failed_message(server):
+    recipients = [f"user{i}@example.com" for i in range(5)]
+    server.drop_before_message = 2
+    pool = _pool(server)
+    pool.send_many(_message(email_to) for email_to in recipients)
+
+    assert server.delivered == recipients
+    assert pool.stats.reconnects == 1
+    assert pool.stats.connections_opened == 2
+    assert pool.stats.messages_sent == 5
+    pool.close()
+
+
+def test_send_many_gives_up_after_max_reconnects(server):
+    server.drop_before_message = 0
+    pool = _pool(server, max_reconnects=0)
+
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        pool.send(*_message("a@example.com"))
+    assert server.delivered == []
@@ -109,13 +109,10 @@ if [ -d "$backend_dir" ]; then
     pip install -r dev_requirements.txt
   fi
   echo "Virtual environment setup and dependencies installed in $backend_dir/.venv"
-  # Initiate Alembic
-  deactivate
+  # Create the schema from the migrations in backend/alembic/versions
   cd ..
-  mkdir -p alembic/versions
-  alembic init alembic
-  alembic revision --autogenerate -m "Initial migration"
   alembic upgrade head
+  deactivate
 else
   echo "Backend directory $backend_dir not found."
 fi
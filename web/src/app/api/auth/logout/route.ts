@@ -1,7 +1,27 @@
 import { NextResponse, NextRequest } from "next/server";
+import { fetchServer } from "@/lib/fetch";
 
-export async function GET(request: NextRequest) {
-  const response = NextResponse.redirect(new URL("/", request.url));
+export async function POST(request: NextRequest) {
+  const token = request.cookies.get("access_token")?.value;
+
+  // Revoke the token on the backend first; clearing the cookie alone would
+  // leave it valid until it expires.
+  if (token) {
+    try {
+      const { error } = await fetchServer("/auth/logout", {
+        method: "POST",
+        headers: { Cookie: `access_token=${token}` },
+      });
+      if (error) {
+        console.error("Failed to revoke access token:", error);
+      }
+    } catch (error) {
+      console.error("Failed to revoke access token:", error);
+    }
+  }
+
+  // 303 so the browser follows the redirect with a GET.
+  const response = NextResponse.redirect(new URL("/", request.url), 303);
 
   response.headers.set(
     "Set-Cookie",
@@ -42,7 +42,9 @@ export default function Navbar({ hideFooter }: NavbarProps) {
             <a href="/account" className="mr-4">
               Account
             </a>
-            <a href="/api/auth/logout">Logout</a>
+            <form action="/api/auth/logout" method="post" className="inline">
+              <button type="submit">Logout</button>
+            </form>
           </div>
         </div>
       </div>